@@ -0,0 +1,59 @@
+import argparse
+from typing import Iterable
+
+
+class AssignmentDecoder:
+    """This class turns a satisfying assignment of the logical formula back into a readable table stating for every
+    profile which committee the P-APP voting rule chooses. It relies on the mapping file that FormulaConstructor
+    writes alongside the formula; each line of this file contains a variable, a profile, and a committee separated
+    by tabulators."""
+
+    def __init__(self, mapping_file: str):
+        self.profiles_and_committees: dict[int, tuple[str, str]] = {}
+        with open(mapping_file, "r") as f:
+            for line in f:
+                if line.startswith("c"):
+                    continue
+                variable, profile, committee = line.rstrip("\n").split("\t")
+                self.profiles_and_committees[int(variable)] = (profile, committee)
+
+    def decode(self, assignment: Iterable[int]) -> list[tuple[str, str]]:
+        """This function takes an assignment (as list of literals) and returns the pairs of profiles and
+        committees whose variables are true; auxiliary variables are ignored."""
+        return [self.profiles_and_committees[literal] for literal in assignment
+                if literal > 0 and literal in self.profiles_and_committees]
+
+    def write_table(self, assignment: Iterable[int], output_file: str) -> None:
+        """This function writes the profile -> committee table of the given assignment into the output file."""
+        with open(output_file, "w") as f:
+            for profile, committee in self.decode(assignment):
+                f.write(profile + " -> " + committee + "\n")
+
+    @staticmethod
+    def read_solver_output(solver_output_file: str) -> list[int]:
+        """This function reads the assignment from the output of a SAT solver. We support the competition format
+        (lines starting with 'v') and the format of minisat (a line 'SAT' followed by the literals)."""
+        assignment = []
+        with open(solver_output_file, "r") as f:
+            for line in f:
+                tokens = line.split()
+                if not tokens or tokens[0] in {"s", "c", "SAT", "UNSAT", "SATISFIABLE", "UNSATISFIABLE"}:
+                    continue
+                if tokens[0] == "v":
+                    tokens = tokens[1:]
+                assignment.extend(int(token) for token in tokens if token != "0")
+        return assignment
+
+
+if __name__ == '__main__':
+    """This function decodes the output of an external SAT solver into a profile -> committee table."""
+    parser = argparse.ArgumentParser(description="This program decodes a satisfying assignment of a formula written by "
+                                                 "EncodePAPPElections.py into a table stating the committee chosen "
+                                                 "for every profile.")
+    parser.add_argument("MappingFile", type=str, help="the mapping file written alongside the formula")
+    parser.add_argument("SolverOutput", type=str, help="the output of the SAT solver containing the assignment")
+    parser.add_argument("OutputFile", type=str, help="Specifies the file in which the table will be written")
+    args = parser.parse_args()
+
+    decoder = AssignmentDecoder(args.MappingFile)
+    decoder.write_table(AssignmentDecoder.read_solver_output(args.SolverOutput), args.OutputFile)
@@ -1,8 +1,13 @@
 import numpy as np
+import itertools
 import math
 
 
 class AxiomHelper:
+    """All methods of this class work on the integer representation computed by PAPPElectionBuilder: ballots are
+    bitmasks, committees are indices into the committee matrix, and profiles are sorted lists of ballot indices.
+    Internally, sets of committees are represented as bitmasks over the committee indices, so that every axiom
+    boils down to intersecting profile-independent tables that are computed once."""
 
     def __init__(self, committee_size: int, number_of_parties: int, number_of_voters: int, pareto_optimality: bool, cleverWR: bool):
         self.m = number_of_parties
@@ -11,123 +16,180 @@ class AxiomHelper:
         self.parties = list(np.arange(0, self.m))
         self.pareto_optimality = pareto_optimality
         self.cleverWR = cleverWR
+        self.maximal_multiplicity = math.ceil(self.n / self.k)
+        'No axiom distinguishes ballots reported by ceil(n/k) voters from ballots reported by more voters.'
 
-    def _compute_unique_approval_scores(self, profile: list[set[int]]) -> list[int]:
-        """Given a profile, this function computes for every party the number of voters that uniquely approve it"""
-        unique_approval_scores = np.zeros(self.m, dtype=int)
-        for party in range(0, self.m):
-            for ballot in profile:
-                if ballot == {party}:
-                    unique_approval_scores[party] += 1
-        return list(unique_approval_scores)
-
-    def _pareto_dominance(self, party1: int, party2: int, profile: list[set[int]]) -> bool:
-        """Given party1, party2, and a profile, this function decides whether party1
+    def _compute_unique_approval_scores(self, signature: tuple[tuple[int, int], ...], ballots: list[int]) \
+            -> list[int]:
+        """Given the signature of a profile and the list of approval ballots, this function computes for every
+        party the number of voters that uniquely approve it (capped at ceil(n/k))"""
+        unique_approval_scores = [0] * self.m
+        for ballot_index, multiplicity in signature:
+            ballot = ballots[ballot_index]
+            if ballot & (ballot - 1) == 0:
+                unique_approval_scores[ballot.bit_length() - 1] = multiplicity
+        return unique_approval_scores
+
+    def _pareto_dominance(self, party1: int, party2: int, profile: list[int]) -> bool:
+        """Given party1, party2, and a profile (as list of ballot bitmasks), this function decides whether party1
         pareto-dominates partz2 in the profile"""
         strict_preference = False
         for ballot in profile:
-            if party2 in ballot and party1 not in ballot:
+            if (ballot >> party2) & 1 and not (ballot >> party1) & 1:
                 return False
-            if party1 in ballot and party2 not in ballot:
+            if (ballot >> party1) & 1 and not (ballot >> party2) & 1:
                 strict_preference = True
         return strict_preference
 
-    def _filter_committees_failing_weak_representation(self, profile: list[set[int]], committees: list[list[int]]) -> list[list[int]]:
-        """Given a profile and a set of committees, this function removes all committees
-        from the set that fail weak representation"""
-        unique_approval_scores = self._compute_unique_approval_scores(profile)
-        parties_deserving_representation = {party for party in self.parties if unique_approval_scores[party] >= self.n / self.k}
-        possible_committees = [committee for committee in committees if parties_deserving_representation.issubset(set(committee))]
-        return possible_committees
-
-    def _filter_committees_failing_pareto_optimality(self, profile: list[set[int]], committees: list[list[int]]) -> list[list[int]]:
-        """"GIven a profile and a set of committees, this function removes all committees
-        from the set that fail Pareto-optimality"""
-        pareto_dominated_parties = set()
-        for party1 in self.parties:
-            for party2 in self.parties:
+    def _compute_committee_supports(self, committees: np.ndarray) -> list[int]:
+        """Given the committee matrix, this function computes for every committee the bitmask of parties that
+        receive at least one seat."""
+        return [sum(1 << party for party in range(0, self.m) if committee[party] > 0) for committee in committees]
+
+    def _compute_committees_containing(self, committee_supports: list[int]) -> list[int]:
+        """This function computes for every set of parties the set of committees in which all these parties
+        receive a seat."""
+        return [sum(1 << committee for committee, support in enumerate(committee_supports) if support & parties
+                    == parties) for parties in range(0, 1 << self.m)]
+
+    def _compute_committees_avoiding(self, committee_supports: list[int]) -> list[int]:
+        """This function computes for every set of parties the set of committees in which none of these parties
+        receives a seat."""
+        return [sum(1 << committee for committee, support in enumerate(committee_supports) if support & parties
+                    == 0) for parties in range(0, 1 << self.m)]
+
+    def _compute_committees_meeting_requirements(self, numbers_of_approvals: np.ndarray) -> list[list[int]]:
+        """This function computes for every ballot index and every number t = 0, ..., k+1 the set of committees
+        that contain at least t members approved by the ballot."""
+        return [[sum(1 << committee for committee in np.flatnonzero(row >= required_number).tolist())
+                 for required_number in range(0, self.k + 2)] for row in numbers_of_approvals]
+
+    def _compute_subset_lattice(self) -> list[list[int]]:
+        """This function computes for every set of parties (as bitmask) the sets that arise by removing a single
+        party; these are the direct predecessors of the set in the subset lattice."""
+        return [[parties ^ (1 << party) for party in range(0, self.m) if (parties >> party) & 1]
+                for parties in range(0, 1 << self.m)]
+
+    def _compute_subset_chain_lengths(self, multiplicities: list[int], subset_lattice: list[list[int]]) -> list[int]:
+        """Given the number of voters reporting each ballot (indexed by bitmask) and the subset lattice, this
+        function computes for every set of parties the maximal number of voters whose ballots form a chain of
+        subsets of this set. A longest chain below a set consists of all voters reporting the set itself and a
+        longest chain below one of its direct predecessors, so one pass over the lattice suffices."""
+        chain_lengths = [0] * len(multiplicities)
+        for parties in range(1, len(multiplicities)):
+            chain_lengths[parties] = multiplicities[parties] + max(chain_lengths[subset]
+                                                                   for subset in subset_lattice[parties])
+        return chain_lengths
+
+    def _filter_committees_failing_weak_representation(self, parties_deserving_representation: int,
+                                                       committees: int, committees_containing: list[int]) -> int:
+        """Given the parties deserving representation, a set of committees, and the table computed by
+        _compute_committees_containing, this function removes all committees from the set that fail weak
+        representation"""
+        return committees & committees_containing[parties_deserving_representation]
+
+    def _filter_committees_failing_pareto_optimality(self, profile: list[int], committees: int,
+                                                     committees_avoiding: list[int]) -> int:
+        """"GIven a profile (as list of ballot bitmasks), a set of committees, and the table computed by
+        _compute_committees_avoiding, this function removes all committees from the set that fail
+        Pareto-optimality"""
+        pareto_dominated_parties = 0
+        for party1 in range(0, self.m):
+            for party2 in range(0, self.m):
                 if self._pareto_dominance(party1, party2, profile):
-                    pareto_dominated_parties.add(party2)
-        possible_committees = [committee for committee in committees if set(committee).isdisjoint(pareto_dominated_parties)]
-        return possible_committees
-
-    def _profile_contains_subset_list(self, profile: list[set[int]], input_set: set[int], start: int, length: int) \
-            -> bool:
-        """"Given a profile, a set of parties, a start index, and length, this function decides whether there
-        is a set of voters from index start to n such that the voters' ballots form a chain of subsets of the
-        given length that ends with the input_set."""
-        if length == 0:
-            return True
-        else:
-            for index in range(start, len(profile)):
-                if profile[index].issubset(set(input_set)):
-                    if self._profile_contains_subset_list(profile, profile[index], index + 1, length - 1):
-                        return True
-        return False
-
-    def _filter_committees_failing_weak_representation_clever(self, profile: list[set[int]], committees: list[list[int]],
-                                                              value_of_committee_for_ballot: dict) -> list[list[int]]:
-        """This function takes a profile, a set of committees, and a map from ballots to committees
-        that states for each ballot committee pair how many members of the committee are approved according
-        to the ballot. Given this information, this function removes all committees from the input set
-        that fail Lemma 1 of [1].
+                    pareto_dominated_parties |= 1 << party2
+        return committees & committees_avoiding[pareto_dominated_parties]
+
+    def _filter_committees_failing_weak_representation_clever(self, signature: tuple[tuple[int, int], ...],
+                                                              ballots: list[int],
+                                                              parties_deserving_representation: int,
+                                                              committees: int,
+                                                              committees_meeting_requirements: list[list[int]],
+                                                              subset_lattice: list[list[int]]) -> int:
+        """This function takes the signature of a profile, the list of approval ballots, the parties deserving
+        representation, a set of committees, the table computed by _compute_committees_meeting_requirements, and
+        the subset lattice. Given this information, this function removes all committees from the input set that
+        fail Lemma 1 of [1].
         """
-        unique_approval_scores = self._compute_unique_approval_scores(profile)
-        parties_deserving_representation = {party for party in self.parties if
-                                            unique_approval_scores[party] >= self.n / self.k}
+        multiplicities = [0] * (1 << self.m)
+        for ballot_index, multiplicity in signature:
+            if ballots[ballot_index] & ~parties_deserving_representation != 0:
+                multiplicities[ballots[ballot_index]] = multiplicity
+        'Voters whose ballots only contain parties deserving representation are ignored, i.e., we only look for'
+        'chains in the reduced profile. A voter is the largest element of a chain of ceil(n/k) voters whose'
+        'ballots are subsets of each other if and only if the longest chain below its ballot is this long.'
+        chain_lengths = self._compute_subset_chain_lengths(multiplicities, subset_lattice)
 
-        required_number_of_approved_members = {}
-        for ballot in profile:
-            ballot_as_tuple = tuple(ballot)
-            if len(ballot) == 1 and ballot_as_tuple[0] in parties_deserving_representation:
-                required_number_of_approved_members[ballot_as_tuple] = 1
+        for ballot_index, multiplicity in signature:
+            ballot = ballots[ballot_index]
+            if multiplicities[ballot] > 0 and chain_lengths[ballot] >= self.maximal_multiplicity:
+                required_number_of_approved_members = bin(parties_deserving_representation & ballot).count("1") + 1
+            elif ballot & parties_deserving_representation == ballot and ballot & (ballot - 1) == 0:
+                required_number_of_approved_members = 1
             else:
-                required_number_of_approved_members[ballot_as_tuple] = 0
-
-        reduced_profile = [ballot for ballot in profile if not ballot.issubset(parties_deserving_representation)]
-        reduced_profile.reverse()
-        'By our construction, profiles are always ordered such that A_i subset A_j if and only if i <= j.'
-        'By reversing the profile, all subsets of a voters ballots are therefore right of it.'
-        'This is required for _profile_contains_subset_list as this profile looks from the start index to the right'
-        'side for find finding subset lists.'
-        for index in range(0, len(reduced_profile)):
-            if self._profile_contains_subset_list(reduced_profile, reduced_profile[index], index + 1, math.ceil(self.n / self.k)-1):
-                required_number_of_approved_members[tuple(reduced_profile[index])] = \
-                    len(parties_deserving_representation.intersection(reduced_profile[index])) + 1
-        return [committee for committee in committees
-                if all([value_of_committee_for_ballot[tuple([entry for item in [committee, ballot] for entry in item])]
-                        >= required_number_of_approved_members[tuple(ballot)] for ballot in profile])]
-
-    def compute_numbers_of_approvals(self, committees: list[list[int]], ballots: list[set[int]]) -> dict:
-        """computes for all committees and ballots how many members of a committee are approved according to
-        the ballot"""
-        number_of_approvals={}
-        for committee in committees:
-            for ballot in ballots:
-                key = [entry for item in [committee, ballot] for entry in item]
-                'We use the combination of the committee and the ballot to have a unique and hashable key.'
-                number_of_approvals[tuple(key)]=len([party for party in committee if party in ballot])
-        return number_of_approvals
-
-    def compute_feasible_committees_for_all_profiles(self, profiles: list[list[set[int]]], committees: list[list[int]],
-                                                     ballots: list[set[int]]) -> list[list[list[int]]]:
-        """This function takes a set of preference profiles, a set of committees, and the set of approval
-        ballots and computes for every profile the subset of committee that satisfies the required axioms.
-        These settings are specified in the initialization of the class."""
-        feasible_committees: list[list[list[int]]] = []
-        for profile in profiles:
-            feasible_committees_for_profile = committees
-            if self.cleverWR:
-                value_of_committee_for_ballot = self.compute_numbers_of_approvals(committees, ballots)
-                feasible_committees_for_profile \
-                    = self._filter_committees_failing_weak_representation_clever(profile,
-                                                                                 feasible_committees_for_profile,
-                                                                                 value_of_committee_for_ballot)
-            else:
-                feasible_committees_for_profile \
-                    = self._filter_committees_failing_weak_representation(profile, feasible_committees_for_profile)
-            if self.pareto_optimality:
-                feasible_committees_for_profile = \
-                    self._filter_committees_failing_pareto_optimality(profile, feasible_committees_for_profile)
-            feasible_committees.append(feasible_committees_for_profile)
+                required_number_of_approved_members = 0
+            committees &= committees_meeting_requirements[ballot_index][required_number_of_approved_members]
+        return committees
+
+    def _compute_profile_signature(self, ballot_indices: list[int]) -> tuple[tuple[int, int], ...]:
+        """Given a profile (as sorted list of ballot indices), this function returns its signature: the pairs of
+        distinct ballot indices and the number of voters reporting them, capped at ceil(n/k). Profiles with the
+        same signature have the same feasible committees."""
+        return tuple((ballot_index, min(len(list(voters)), self.maximal_multiplicity))
+                     for ballot_index, voters in itertools.groupby(ballot_indices))
+
+    def compute_numbers_of_approvals(self, committees: np.ndarray, ballots: list[int]) -> np.ndarray:
+        """computes for all ballots and committees how many members of a committee are approved according to
+        the ballot; the result is a matrix indexed by ballot index and committee index"""
+        ballot_approves_party = (np.array(ballots)[:, np.newaxis] >> np.arange(0, self.m)) & 1
+        return (ballot_approves_party[:, np.newaxis, :] * committees[np.newaxis, :, :]).sum(axis=2, dtype=np.int8)
+
+    def compute_feasible_committees_for_all_profiles(self, profiles: np.ndarray, committees: np.ndarray,
+                                                     ballots: list[int], numbers_of_approvals: np.ndarray) \
+            -> list[list[int]]:
+        """This function takes the profile matrix, the committee matrix, the list of approval ballots, and the
+        matrix computed by compute_numbers_of_approvals and computes for every profile the subset of committee
+        indices that satisfies the required axioms. These settings are specified in the initialization of the
+        class. Profiles with the same signature share the same list."""
+        committee_supports = self._compute_committee_supports(committees)
+        all_committees = (1 << len(committees)) - 1
+        if self.cleverWR:
+            committees_meeting_requirements = self._compute_committees_meeting_requirements(numbers_of_approvals)
+            subset_lattice = self._compute_subset_lattice()
+        else:
+            committees_containing = self._compute_committees_containing(committee_supports)
+        if self.pareto_optimality:
+            committees_avoiding = self._compute_committees_avoiding(committee_supports)
+
+        feasible_committees_by_signature: dict[tuple[tuple[int, int], ...], list[int]] = {}
+        feasible_committees_by_set: dict[int, list[int]] = {}
+        feasible_committees: list[list[int]] = []
+        for ballot_indices in profiles.tolist():
+            signature = self._compute_profile_signature(ballot_indices)
+            if signature not in feasible_committees_by_signature:
+                unique_approval_scores = self._compute_unique_approval_scores(signature, ballots)
+                parties_deserving_representation = sum(1 << party for party in range(0, self.m)
+                                                       if unique_approval_scores[party] >= self.n / self.k)
+                if self.cleverWR:
+                    feasible_committees_for_profile = \
+                        self._filter_committees_failing_weak_representation_clever(signature, ballots,
+                                                                                   parties_deserving_representation,
+                                                                                   all_committees,
+                                                                                   committees_meeting_requirements,
+                                                                                   subset_lattice)
+                else:
+                    feasible_committees_for_profile = \
+                        self._filter_committees_failing_weak_representation(parties_deserving_representation,
+                                                                            all_committees, committees_containing)
+                if self.pareto_optimality:
+                    feasible_committees_for_profile = self._filter_committees_failing_pareto_optimality(
+                        [ballots[ballot_index] for ballot_index, _ in signature], feasible_committees_for_profile,
+                        committees_avoiding)
+                if feasible_committees_for_profile not in feasible_committees_by_set:
+                    feasible_committees_by_set[feasible_committees_for_profile] = \
+                        [committee for committee in range(0, len(committees))
+                         if (feasible_committees_for_profile >> committee) & 1]
+                feasible_committees_by_signature[signature] = \
+                    feasible_committees_by_set[feasible_committees_for_profile]
+            feasible_committees.append(feasible_committees_by_signature[signature])
         return feasible_committees
@@ -0,0 +1,145 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+
+
+class BenchmarkRunner:
+    """This class runs EncodePAPPElections.py for a grid of parameters k, m, n and all combinations of a set of
+    flags, and collects the statistics of every run into one table with a line per configuration. Every
+    configuration is run in a separate process, so that time and memory measurements do not influence each other
+    and runs exceeding the timeout can be stopped. If a run is repeated, the repetition with the smallest total
+    wall time is kept."""
+
+    PHASES = ["cache load", "enumeration", "feasibility", "data manager", "symmetry breaking", "function clauses",
+              "strategy-proofness clauses", "solve", "counterexample-guided solve", "group MUS"]
+    SOLVE_PHASES = ["solve", "counterexample-guided solve"]
+    'Phases whose counts contain the verdict of the SAT solver.'
+    COLUMNS = ["k", "m", "n", "flags", "extra args", "status", "profiles", "variables", "clauses", "result"] \
+        + [phase + " time" for phase in PHASES] + ["total time", "max rss", "peak traced memory"]
+
+    def __init__(self, extra_arguments: list[str], repeat: int = 1, timeout: float = None,
+                 trace_memory: bool = False):
+        self.extra_arguments = extra_arguments
+        self.repeat = repeat
+        self.timeout = timeout
+        self.trace_memory = trace_memory
+        self.encoder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "EncodePAPPElections.py")
+
+    def run_configuration(self, k: int, m: int, n: int, flags: list[str]) -> dict:
+        """This function runs a single configuration (repeatedly) and returns the line of the results table."""
+        row = {"k": k, "m": m, "n": n, "flags": " ".join(flags), "extra args": " ".join(self.extra_arguments)}
+        best_statistics = None
+        for _ in range(0, self.repeat):
+            with tempfile.TemporaryDirectory() as directory:
+                statistics_file = os.path.join(directory, "statistics.json")
+                command = [sys.executable, self.encoder, "-k", str(k), "-m", str(m), "-n", str(n)] + flags \
+                    + self.extra_arguments + ["--stats-json", statistics_file, os.path.join(directory, "formula.cnf")]
+                if self.trace_memory:
+                    command.append("--trace-memory")
+                try:
+                    process = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                             timeout=self.timeout)
+                except subprocess.TimeoutExpired:
+                    row["status"] = "timeout"
+                    return row
+                if process.returncode != 0:
+                    row["status"] = "error " + str(process.returncode)
+                    print(process.stderr.decode(errors="replace"), file=sys.stderr)
+                    return row
+                with open(statistics_file, "r") as f:
+                    statistics = json.load(f)
+            if best_statistics is None or statistics["total"]["wall_time"] < best_statistics["total"]["wall_time"]:
+                best_statistics = statistics
+        row["status"] = "ok"
+        row.update(self._summarize(best_statistics))
+        return row
+
+    def _summarize(self, statistics: dict) -> dict:
+        """This function condenses the statistics of a run into the columns of the results table. The numbers of
+        variables and clauses are those of the written formula, as recorded with the variable mapping."""
+        phases = {phase["phase"]: phase for phase in statistics["phases"]}
+        row = {"profiles": next(phase["profiles"] for phase in statistics["phases"] if "profiles" in phase),
+               "variables": phases["variable mapping"]["variables"],
+               "clauses": phases["variable mapping"]["clauses"],
+               "result": next((phases[phase]["result"] for phase in self.SOLVE_PHASES if phase in phases), "")}
+        for phase in self.PHASES:
+            row[phase + " time"] = "%.3f" % phases[phase]["wall_time"] if phase in phases else ""
+        row["total time"] = "%.3f" % statistics["total"]["wall_time"]
+        row["max rss"] = statistics["total"].get("max_rss", "")
+        row["peak traced memory"] = statistics["total"].get("peak_traced_memory", "")
+        return row
+
+    def run_grid(self, committee_sizes: list[int], numbers_of_parties: list[int], numbers_of_voters: list[int],
+                 varied_flags: list[str]) -> list[dict]:
+        """This function runs all configurations of the grid and returns the lines of the results table. The
+        progress is printed to the console."""
+        rows = []
+        for k, m, n in itertools.product(committee_sizes, numbers_of_parties, numbers_of_voters):
+            for number_of_flags in range(0, len(varied_flags) + 1):
+                for flags in itertools.combinations(varied_flags, number_of_flags):
+                    row = self.run_configuration(k, m, n, ["--" + flag for flag in flags])
+                    print("k=" + str(k) + " m=" + str(m) + " n=" + str(n) + " " + row["flags"] + ": "
+                          + row["status"] + (" in " + row["total time"] + "s" if row["status"] == "ok" else ""))
+                    rows.append(row)
+        return rows
+
+    @staticmethod
+    def compare(rows: list[dict], baseline_file: str) -> None:
+        """This function adds to every line the speedup in total wall time compared with the same configuration
+        (including the further arguments) in a results table written by an earlier run."""
+        with open(baseline_file, "r", newline="") as f:
+            baseline = {(row["k"], row["m"], row["n"], row["flags"], row.get("extra args", "")): row
+                        for row in csv.DictReader(f)}
+        for row in rows:
+            baseline_row = baseline.get((str(row["k"]), str(row["m"]), str(row["n"]), row["flags"], row["extra args"]))
+            if baseline_row is not None and baseline_row["status"] == "ok" and row["status"] == "ok":
+                row["speedup"] = "%.2f" % (float(baseline_row["total time"]) / max(float(row["total time"]), 1e-6))
+            else:
+                row["speedup"] = ""
+
+    @staticmethod
+    def write_table(rows: list[dict], output_file: str) -> None:
+        """This function writes the results table as CSV file."""
+        columns = BenchmarkRunner.COLUMNS + (["speedup"] if rows and "speedup" in rows[0] else [])
+        with open(output_file, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, restval="")
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    """This function parses the command line input and runs the benchmark."""
+    parser = argparse.ArgumentParser(description="This program runs EncodePAPPElections.py for a grid of parameters "
+                                                 "and flag combinations and writes the statistics of all runs into a "
+                                                 "CSV table, so that the effect of optimizations can be measured.")
+    parser.add_argument("OutputFile", type=str, help="Specifies the CSV file in which the results will be written")
+    parser.add_argument("-k", type=int, nargs="+", default=[3], help="committee sizes k (3 by default)")
+    parser.add_argument("-m", type=int, nargs="+", default=[4], help="numbers of parties m (4 by default)")
+    parser.add_argument("-n", type=int, nargs="+", default=[6], help="numbers of voters n (6 by default)")
+    parser.add_argument("--vary", nargs="*", choices=["cleverWR", "PO", "allprofiles"], default=["cleverWR", "PO"],
+                        help="flags whose combinations are benchmarked for every k, m, n (cleverWR and PO by default)")
+    parser.add_argument("--extra-args", type=str, default="",
+                        help="further arguments passed to every run, e.g., --extra-args=\"--SATsolve --sp-encoding "
+                             "threshold\"")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="number of repetitions of every run; the fastest repetition is reported (1 by default)")
+    parser.add_argument("--timeout", type=float, default=None, help="timeout of every run in seconds (none by default)")
+    parser.add_argument("--trace-memory", action="store_true", default=False,
+                        help="If specified, the peak memory of every phase is traced with tracemalloc; this slows down "
+                             "the runs considerably (by default off)")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="results table of an earlier run; if specified, the speedup of every configuration is "
+                             "added to the table")
+    args = parser.parse_args()
+
+    runner = BenchmarkRunner(shlex.split(args.extra_args), args.repeat, args.timeout, args.trace_memory)
+    results = runner.run_grid(args.k, args.m, args.n, args.vary)
+    if args.baseline is not None:
+        BenchmarkRunner.compare(results, args.baseline)
+    BenchmarkRunner.write_table(results, args.OutputFile)
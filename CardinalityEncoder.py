@@ -0,0 +1,123 @@
+import math
+
+
+class CardinalityEncoder:
+    """This class encodes that exactly one of a list of variables is true. The at-least-one part is always a
+    single clause; for the at-most-one part, several encodings are available:
+
+    pairwise    one binary clause per pair of variables (no auxiliary variables, quadratically many clauses)
+    sequential  the sequential counter of Sinz (2005) with n-1 auxiliary variables and 3n-4 clauses
+    commander   the commander encoding of Klieber and Kwon (2007) with groups of three variables
+    product     the product encoding of Chen (2010), which arranges the variables in a grid
+    bimander    the bimander encoding of Nguyen and Mai (2015) with groups of two variables
+
+    Auxiliary variables are taken consecutively starting from a given variable, so callers can reserve a block of
+    number_of_auxiliary_variables(n) variables for every constraint in advance."""
+
+    AMO_ENCODINGS = ["pairwise", "sequential", "commander", "product", "bimander"]
+    COMMANDER_GROUP_SIZE = 3
+    BIMANDER_GROUP_SIZE = 2
+    PAIRWISE_THRESHOLD = 4
+    'Recursive encodings fall back to the pairwise encoding for at most this many variables.'
+
+    def __init__(self, amo_encoding: str = "pairwise"):
+        if amo_encoding not in self.AMO_ENCODINGS:
+            raise ValueError("Unknown at-most-one encoding " + amo_encoding + "; expected one of "
+                             + ", ".join(self.AMO_ENCODINGS))
+        self.amo_encoding = amo_encoding
+        self._numbers_of_auxiliary_variables: dict[int, int] = {}
+
+    def encode_exactly_one(self, variables: list[int], first_auxiliary_variable: int) -> list[list[int]]:
+        """This function returns the clauses encoding that exactly one of the given variables is true. The
+        auxiliary variables first_auxiliary_variable, first_auxiliary_variable + 1, ... are used if needed."""
+        clauses = [list(variables)]
+        self._encode_at_most_one(variables, first_auxiliary_variable, clauses, self.amo_encoding)
+        return clauses
+
+    def number_of_auxiliary_variables(self, number_of_variables: int) -> int:
+        """This function returns the number of auxiliary variables used to encode an exactly-one constraint on
+        the given number of variables."""
+        if number_of_variables not in self._numbers_of_auxiliary_variables:
+            first_auxiliary_variable = number_of_variables + 1
+            self._numbers_of_auxiliary_variables[number_of_variables] = \
+                self._encode_at_most_one(list(range(1, number_of_variables + 1)), first_auxiliary_variable, [],
+                                         self.amo_encoding) - first_auxiliary_variable
+        return self._numbers_of_auxiliary_variables[number_of_variables]
+
+    def _encode_at_most_one(self, variables: list[int], next_auxiliary_variable: int, clauses: list[list[int]],
+                            encoding: str) -> int:
+        """Appends the clauses of the given at-most-one encoding to clauses and returns the next unused auxiliary
+        variable."""
+        if len(variables) <= 1:
+            return next_auxiliary_variable
+        if encoding == "pairwise" or (encoding != "sequential" and len(variables) <= self.PAIRWISE_THRESHOLD):
+            return self._encode_pairwise(variables, next_auxiliary_variable, clauses)
+        if encoding == "sequential":
+            return self._encode_sequential(variables, next_auxiliary_variable, clauses)
+        if encoding == "commander":
+            return self._encode_commander(variables, next_auxiliary_variable, clauses)
+        if encoding == "product":
+            return self._encode_product(variables, next_auxiliary_variable, clauses)
+        return self._encode_bimander(variables, next_auxiliary_variable, clauses)
+
+    def _encode_pairwise(self, variables: list[int], next_auxiliary_variable: int, clauses: list[list[int]]) -> int:
+        """At most one variable is true iff no pair of variables is true."""
+        for index1 in range(0, len(variables)):
+            for index2 in range(index1 + 1, len(variables)):
+                clauses.append([-variables[index1], -variables[index2]])
+        return next_auxiliary_variable
+
+    def _encode_sequential(self, variables: list[int], next_auxiliary_variable: int, clauses: list[list[int]]) -> int:
+        """The auxiliary variable s_i states that one of the first i variables is true."""
+        counters = list(range(next_auxiliary_variable, next_auxiliary_variable + len(variables) - 1))
+        clauses.append([-variables[0], counters[0]])
+        for index in range(1, len(variables) - 1):
+            clauses.append([-variables[index], counters[index]])
+            clauses.append([-counters[index - 1], counters[index]])
+            clauses.append([-variables[index], -counters[index - 1]])
+        clauses.append([-variables[-1], -counters[-1]])
+        return next_auxiliary_variable + len(counters)
+
+    def _encode_commander(self, variables: list[int], next_auxiliary_variable: int, clauses: list[list[int]]) -> int:
+        """The variables are split into groups with one commander variable each; every true variable forces its
+        commander to be true, at most one variable per group is true, and recursively at most one commander is
+        true."""
+        commanders = []
+        for start in range(0, len(variables), self.COMMANDER_GROUP_SIZE):
+            group = variables[start:start + self.COMMANDER_GROUP_SIZE]
+            commander = next_auxiliary_variable
+            next_auxiliary_variable += 1
+            commanders.append(commander)
+            self._encode_pairwise(group, next_auxiliary_variable, clauses)
+            for variable in group:
+                clauses.append([-variable, commander])
+        return self._encode_at_most_one(commanders, next_auxiliary_variable, clauses, "commander")
+
+    def _encode_product(self, variables: list[int], next_auxiliary_variable: int, clauses: list[list[int]]) -> int:
+        """The variables are arranged in a grid with p rows and q columns; every true variable forces its row and
+        column variable to be true, and recursively at most one row and at most one column variable is true."""
+        number_of_rows = math.ceil(math.sqrt(len(variables)))
+        number_of_columns = math.ceil(len(variables) / number_of_rows)
+        rows = list(range(next_auxiliary_variable, next_auxiliary_variable + number_of_rows))
+        columns = list(range(next_auxiliary_variable + number_of_rows,
+                             next_auxiliary_variable + number_of_rows + number_of_columns))
+        next_auxiliary_variable += number_of_rows + number_of_columns
+        for index, variable in enumerate(variables):
+            clauses.append([-variable, rows[index // number_of_columns]])
+            clauses.append([-variable, columns[index % number_of_columns]])
+        next_auxiliary_variable = self._encode_at_most_one(rows, next_auxiliary_variable, clauses, "product")
+        return self._encode_at_most_one(columns, next_auxiliary_variable, clauses, "product")
+
+    def _encode_bimander(self, variables: list[int], next_auxiliary_variable: int, clauses: list[list[int]]) -> int:
+        """The variables are split into groups; at most one variable per group is true, and every true variable
+        forces the auxiliary bit variables to the binary representation of its group index."""
+        number_of_groups = math.ceil(len(variables) / self.BIMANDER_GROUP_SIZE)
+        number_of_bits = max(1, math.ceil(math.log2(number_of_groups)))
+        bits = list(range(next_auxiliary_variable, next_auxiliary_variable + number_of_bits))
+        for group_index in range(0, number_of_groups):
+            group = variables[group_index * self.BIMANDER_GROUP_SIZE:(group_index + 1) * self.BIMANDER_GROUP_SIZE]
+            self._encode_pairwise(group, next_auxiliary_variable, clauses)
+            for variable in group:
+                for bit_index, bit in enumerate(bits):
+                    clauses.append([-variable, bit if (group_index >> bit_index) & 1 else -bit])
+        return next_auxiliary_variable + number_of_bits
@@ -1,47 +1,110 @@
 import numpy as np
+import array
+import bisect
+import math
 
 
 class DataManager:
+    """All methods of this class work on indices: ballots and committees are identified by their position in
+    the ballot list and committee matrix, and profiles are sorted sequences of ballot indices (or their position
+    in the profile matrix)."""
 
-    def __init__(self, ballots: list[set[int]], committees: list[list[int]], profiles: list[list[set[int]]],
-                 feasible_committees_for_all_profiles: list[list[list[int]]]):
-        self.multiplier = len(committees)
-        self.ballots=ballots
-        self.ballots_to_list_index = self._list_to_list_position_dict(ballots)
-        self.committees_to_list_index = self._list_to_list_position_dict(committees)
-        self.profiles_to_list_index_dict = self._build_profiles_to_list_index_dict(profiles)
-        self.feasible_committees_for_all_profiles=feasible_committees_for_all_profiles
-        self.manipulation_table = self._compute_manipulation_table(committees, ballots)
-
-    def _compute_manipulation_table(self, committees: list[list[int]], ballots: list[set[int]]) \
-            -> list[list[list[bool]]]:
-        """This function takes a set of committees and ballots, and outputs a list stating for all triples
-        of the form (ballot, committee1, committee2) whether a voter with ballot as preference prefers
-        committee1 to committee2."""
-        manipulation_table = []
-        for ballot in ballots:
-            preference_table=[]
-            for committee1 in committees:
-                item=[]
-                for committee2 in committees:
-                    item.append(len([party for party in committee1 if party in ballot]) >
-                                len([party for party in committee2 if party in ballot]))
-                preference_table.append(item)
-            manipulation_table.append(preference_table)
-        return manipulation_table
-
-    def _build_profiles_to_list_index_dict(self, profiles) -> dict:
-        """This function takes a list of profiles as input and
-        computes a map from the profiles to their position in the list."""
-        profiles_by_ballot_indices = [np.sort([self.ballots_to_list_index[tuple(ballot)] for ballot in profile])
-                                      for profile in profiles]
-        return self._list_to_list_position_dict(profiles_by_ballot_indices)
-
-    def _profile_to_list_index(self, profile: list[set[int]]) -> int:
-        """This function takes a profile as input and returns a set containing the list indices of the
-        ballots in the profile"""
-        profile_by_ballot_indices = [self.ballots_to_list_index[tuple(ballot)] for ballot in profile]
-        return self.profiles_to_list_index_dict[tuple(profile_by_ballot_indices)]
+    def __init__(self, ballots: list[int], committees: np.ndarray, profiles: np.ndarray,
+                 feasible_committees_for_all_profiles: list[list[int]], numbers_of_approvals: np.ndarray,
+                 profile_ranks: np.ndarray = None):
+        self.ballots = ballots
+        self.ballots_to_list_index = {ballot: index for index, ballot in enumerate(ballots)}
+        self.committees_to_list_index = self._list_to_list_position_dict(committees.tolist())
+        self._binomials = [[math.comb(i, j) for j in range(0, profiles.shape[1] + 2)]
+                           for i in range(0, len(ballots) + profiles.shape[1] + 1)]
+        if profile_ranks is None:
+            profile_ranks = self._compute_profile_ranks(profiles)
+        self._profile_ranks = profile_ranks.tolist()
+        'The ranks can be passed in if they were computed before, e.g., by an earlier run (see DomainCache).'
+        self._rank_to_profile_index = self._build_rank_to_profile_index_table(profiles.shape[1])
+        self.feasible_committees_for_all_profiles = feasible_committees_for_all_profiles
+        self._variable_offsets = self._compute_variable_offsets(feasible_committees_for_all_profiles)
+        self.number_of_committee_variables = self._variable_offsets[-1]
+        self.number_of_variables = self.number_of_committee_variables
+        'Variables are only introduced for feasible (profile, committee) pairs and are numbered consecutively.'
+        self.numbers_of_approvals = numbers_of_approvals
+        'The matrix states for every ballot and committee how many committee members the ballot approves.'
+        self._numbers_of_approvals_rows = numbers_of_approvals.tolist()
+        'Python view of the same (ballots x committees) table for fast scalar lookups in the clause generation.'
+
+    MAXIMAL_DENSE_RANK_TABLE_SIZE = 2 ** 24
+    'If there are more anonymous profiles than this, ranks are mapped to profile indices by a dictionary instead.'
+
+    def _compute_profile_ranks(self, profiles: np.ndarray) -> np.ndarray:
+        """This function computes for every profile its rank in the combinatorial number system: the sorted ballot
+        indices x_0 <= ... <= x_{n-1} correspond to the strictly increasing sequence x_i + i, whose colexicographic
+        rank sum_i binom(x_i + i, i + 1) is a bijection between anonymous profiles and 0, ..., binom(b+n-1, n)-1."""
+        binomials = np.array(self._binomials, dtype=object)
+        ranks = np.zeros(len(profiles), dtype=object)
+        for position in range(0, profiles.shape[1]):
+            ranks += binomials[profiles[:, position].astype(np.int64) + position, position + 1]
+        return ranks
+
+    def export_profile_ranks(self) -> np.ndarray:
+        """This function returns the ranks of all profiles as integer array or None if they do not fit into 64
+        bits."""
+        if self._profile_ranks and max(self._profile_ranks) >= 2 ** 63:
+            return None
+        return np.array(self._profile_ranks, dtype=np.int64)
+
+    def _build_rank_to_profile_index_table(self, number_of_voters: int):
+        """This function computes the map from profile ranks to positions in the profile matrix. If the space of
+        all anonymous profiles is small enough, this is a dense array in which -1 marks profiles outside the
+        domain; otherwise, it is a dictionary."""
+        number_of_anonymous_profiles = self._binomials[len(self.ballots) + number_of_voters - 1][number_of_voters]
+        if number_of_anonymous_profiles <= self.MAXIMAL_DENSE_RANK_TABLE_SIZE:
+            table = np.full(number_of_anonymous_profiles, -1, dtype=np.int32)
+            table[np.array(self._profile_ranks, dtype=np.int64)] = np.arange(0, len(self._profile_ranks))
+            return array.array("i", table.tobytes())
+        return {rank: index for index, rank in enumerate(self._profile_ranks)}
+
+    def _rank_to_index(self, rank: int) -> int:
+        """Returns the position of the profile with the given rank in the profile matrix or -1 if the profile is
+        not part of the domain."""
+        if isinstance(self._rank_to_profile_index, dict):
+            return self._rank_to_profile_index.get(rank, -1)
+        return self._rank_to_profile_index[rank]
+
+    def compute_rank(self, profile: list[int]) -> int:
+        """This function computes the rank of an anonymous profile (as sorted ballot indices)."""
+        return sum(self._binomials[ballot_index + position][position + 1]
+                   for position, ballot_index in enumerate(profile))
+
+    def get_manipulated_profile_index(self, profile_index: int, profile: list[int], manipulator: int,
+                                      ballot_index: int) -> int:
+        """Given the index of a profile, its sorted ballot indices, a voter, and a new ballot, this function returns
+        the index of the profile in which the voter reports the new ballot instead, or -1 if this profile is not
+        part of the domain. The rank of the new profile is obtained from the rank of the old one by integer
+        arithmetic: we remove the voter's ballot, shift the voters between the old and the new position of the
+        ballot by one, and insert the new ballot."""
+        binomials = self._binomials
+        old_ballot_index = profile[manipulator]
+        rank = self._profile_ranks[profile_index] - binomials[old_ballot_index + manipulator][manipulator + 1]
+        position = manipulator
+        if ballot_index > old_ballot_index:
+            while position + 1 < len(profile) and profile[position + 1] < ballot_index:
+                value = profile[position + 1]
+                rank += binomials[value + position][position + 1] - binomials[value + position + 1][position + 2]
+                position += 1
+        else:
+            while position > 0 and profile[position - 1] > ballot_index:
+                value = profile[position - 1]
+                rank += binomials[value + position][position + 1] - binomials[value + position - 1][position]
+                position -= 1
+        rank += binomials[ballot_index + position][position + 1]
+        return self._rank_to_index(rank)
+
+    def _compute_variable_offsets(self, feasible_committees_for_all_profiles: list[list[int]]) -> list[int]:
+        """This function computes for every profile the number of variables used by the profiles before it; the
+        last entry is the total number of variables."""
+        numbers_of_feasible_committees = np.fromiter((len(committees) for committees in
+                                                      feasible_committees_for_all_profiles), dtype=np.int64)
+        return np.concatenate(([0], np.cumsum(numbers_of_feasible_committees))).tolist()
 
     def _list_to_list_position_dict(self, input_list):
         """This function takes an list (where each element is hashable) and returns a map from the list
@@ -51,37 +114,82 @@ class DataManager:
             output_dict[tuple(input_list[i])] = i
         return output_dict
 
-    def get_committee_index(self, committee: list[list[int]]) -> int:
-        """This function takes a committee and returns the position of the committee in the committee list"""
+    def get_ballot_index(self, ballot: int) -> int:
+        """This function takes a ballot (as bitmask) and returns the position of the ballot in the ballot list"""
+        return self.ballots_to_list_index[ballot]
+
+    def get_committee_index(self, committee: list[int]) -> int:
+        """This function takes a committee (as vector of seat counts) and returns the position of the committee
+        in the committee matrix"""
         return self.committees_to_list_index[tuple(committee)]
 
-    def get_variable(self, profile: list[set[int]], committee: list[int]) -> int:
-        """This function takes a profile and a committee as input and returns the integer corresponding
-        to the variable of the input data in the logical formula."""
-        return self.multiplier*(1+self._profile_to_list_index(profile)) \
-               + self.committees_to_list_index[tuple(committee)]
+    def get_profile_index(self, profile: list[int]) -> int:
+        """This function takes an anonymous profile (as sorted ballot indices) and returns its position in the
+        profile matrix"""
+        profile_index = self._rank_to_index(self.compute_rank(profile))
+        if profile_index < 0:
+            raise KeyError("The profile " + str(profile) + " is not part of the domain.")
+        return profile_index
 
-    def get_feasible_committees_for_profile(self, profile: list[set[int]]) -> list[list[int]]:
-        """This function takes a profile as input and returns the set of committees satisfying the
+    def get_variable(self, profile_index: int, committee_index: int) -> int:
+        """This function takes a profile index and the index of a committee that is feasible for this profile as
+        input and returns the integer corresponding to the variable of the input data in the logical formula."""
+        feasible_committees = self.feasible_committees_for_all_profiles[profile_index]
+        position = bisect.bisect_left(feasible_committees, committee_index)
+        if position == len(feasible_committees) or feasible_committees[position] != committee_index:
+            raise KeyError("The committee " + str(committee_index) + " is not feasible for the profile "
+                           + str(profile_index) + ".")
+        return self._variable_offsets[profile_index] + position + 1
+
+    def allocate_auxiliary_variables(self, numbers_of_variables: list[int]) -> list[int]:
+        """This function reserves consecutive blocks of auxiliary variables after all variables allocated so far,
+        one block for every entry of the input list, and returns the first variable of each block."""
+        block_offsets = np.concatenate(([0], np.cumsum(np.array(numbers_of_variables, dtype=np.int64))))
+        first_variables = (block_offsets[:-1] + self.number_of_variables + 1).tolist()
+        self.number_of_variables += int(block_offsets[-1])
+        return first_variables
+
+    def get_first_variable(self, profile_index: int) -> int:
+        """This function returns the variable of the first feasible committee of the given profile. The variables
+        of the feasible committees of a profile are consecutive and ordered as in
+        get_feasible_committees_for_profile."""
+        return self._variable_offsets[profile_index] + 1
+
+    def decode_variable(self, variable: int) -> tuple[int, int]:
+        """This function takes a variable and returns the profile index and committee index it encodes."""
+        if not 0 < variable <= self.number_of_committee_variables:
+            raise KeyError("The variable " + str(variable) + " does not encode a profile and a committee.")
+        profile_index = bisect.bisect_right(self._variable_offsets, variable - 1) - 1
+        position = variable - 1 - self._variable_offsets[profile_index]
+        return profile_index, self.feasible_committees_for_all_profiles[profile_index][position]
+
+    def get_feasible_committees_for_profile(self, profile_index: int) -> list[int]:
+        """This function takes a profile index as input and returns the indices of the committees satisfying the
         specified axioms (weak representation, Pareto-optimality) for this profile. """
-        return self.feasible_committees_for_all_profiles[self._profile_to_list_index(profile)]
-
-    def is_profile_known(self, profile: list[set[int]]) -> bool:
-        """This function checks whether the input profile is contained in the map from profiles to
-        integers."""
-        profile_by_ballot_indices = [self.ballots_to_list_index[tuple(ballot)] for ballot in profile]
-        profile_by_ballot_indices.sort()
-        return tuple(profile_by_ballot_indices) in self.profiles_to_list_index_dict.keys()
-
-    def get_anonymous_profile(self, profile: list[set[int]]) -> list[set[int]]:
-        """Given an input profile, this function returns the canonical representative of this profile."""
-        profile_by_ballot_indices = [self.ballots_to_list_index[tuple(ballot)] for ballot in profile]
-        profile_by_ballot_indices.sort()
-        return [self.ballots[index] for index in profile_by_ballot_indices]
-
-    def voter_prefers_committee1_to_committee2(self, ballot: set[int], committee1: list[int], committee2: list[int])\
-            -> bool:
-        """Given a ballot and two committees c1 and c2, this function decides whether a voter with the ballot as
-        preference relation prefers c1 to c2."""
-        return self.manipulation_table[self.ballots_to_list_index[tuple(ballot)
-        ]][self.committees_to_list_index[tuple(committee1)]][self.committees_to_list_index[tuple(committee2)]]
+        return self.feasible_committees_for_all_profiles[profile_index]
+
+    def get_profile_indices(self, profiles: np.ndarray) -> list[int]:
+        """This function takes a matrix of anonymous profiles (as rows of sorted ballot indices) and returns their
+        positions in the profile matrix, or -1 for profiles that are not part of the domain."""
+        return [self._rank_to_index(rank) for rank in self._compute_profile_ranks(profiles).tolist()]
+
+    def is_profile_known(self, profile: list[int]) -> bool:
+        """This function checks whether the input anonymous profile is part of the domain."""
+        return self._rank_to_index(self.compute_rank(profile)) >= 0
+
+    def get_anonymous_profile(self, profile: list[int]) -> list[int]:
+        """Given an input profile (as ballot indices), this function returns the canonical representative of
+        this profile."""
+        return sorted(profile)
+
+    def get_number_of_approved_members(self, ballot_index: int, committee_index: int) -> int:
+        """Given a ballot and a committee (both as indices), this function returns how many members of the
+        committee are approved according to the ballot."""
+        return self._numbers_of_approvals_rows[ballot_index][committee_index]
+
+    def voter_prefers_committee1_to_committee2(self, ballot_index: int, committee1_index: int,
+                                               committee2_index: int) -> bool:
+        """Given a ballot and two committees c1 and c2 (all as indices), this function decides whether a voter
+        with the ballot as preference relation prefers c1 to c2."""
+        numbers_of_approvals = self._numbers_of_approvals_rows[ballot_index]
+        return numbers_of_approvals[committee1_index] > numbers_of_approvals[committee2_index]
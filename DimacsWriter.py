@@ -0,0 +1,119 @@
+import array
+import itertools
+import os
+from typing import Iterable, Iterator
+
+
+class DimacsWriter:
+    """This class streams clauses into a file in DIMACS format. Clauses are buffered and written in chunks, and
+    the number of variables and clauses is tracked on the fly. Since these numbers are only known once all
+    clauses have been written, we reserve space for the header line and back-patch it when the writer is closed. If
+    the writing is interrupted by an exception, the incomplete file is deleted instead, so that a truncated formula
+    with a matching header is never left behind."""
+
+    HEADER_WIDTH = 48
+    'Number of characters reserved for the header line (without the line break); the header is padded with spaces.'
+
+    def __init__(self, output_file: str, chunk_size: int = 65536):
+        self.output_file = output_file
+        self.chunk_size = chunk_size
+        self.number_of_variables = 0
+        self.number_of_clauses = 0
+        self._file = open(output_file, "wb")
+        self._file.write(b" " * self.HEADER_WIDTH + b"\n")
+
+    def __enter__(self) -> "DimacsWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def write_clauses(self, clauses: Iterable[list[int]]) -> None:
+        """This function takes an iterable of clauses and appends them to the output file. The clauses are
+        consumed lazily, so only one chunk of clauses is held in memory at any time."""
+        clauses = iter(clauses)
+        while True:
+            chunk = list(itertools.islice(clauses, self.chunk_size))
+            if not chunk:
+                break
+            self.write_formatted_clauses(*self.format_clauses(chunk))
+
+    def write_formatted_clauses(self, data: bytes, number_of_clauses: int, max_variable: int) -> None:
+        """This function appends clauses that have already been formatted by format_clauses (e.g., by a worker
+        process) to the output file."""
+        self._file.write(data)
+        self.number_of_clauses += number_of_clauses
+        self.number_of_variables = max(self.number_of_variables, max_variable)
+
+    @staticmethod
+    def format_clauses(clauses: list[list[int]]) -> tuple[bytes, int, int]:
+        """This function formats a list of clauses as DIMACS lines and returns them together with the number of
+        clauses and the largest variable occurring in them."""
+        max_var = 0
+        lines = []
+        for clause in clauses:
+            for literal in clause:
+                if literal > max_var:
+                    max_var = literal
+                elif -literal > max_var:
+                    max_var = -literal
+            lines.append(" ".join(map(str, clause)) + " 0\n")
+        return "".join(lines).encode("ascii"), len(lines), max_var
+
+    def close(self) -> None:
+        """This function writes the final header line into the reserved space and closes the output file."""
+        if self._file.closed:
+            return
+        header = "p cnf " + str(self.number_of_variables) + " " + str(self.number_of_clauses)
+        if len(header) > self.HEADER_WIDTH:
+            raise ValueError("The header line " + header + " does not fit into the reserved space.")
+        self._file.seek(0)
+        self._file.write(header.ljust(self.HEADER_WIDTH).encode("ascii"))
+        self._file.close()
+
+    @staticmethod
+    def pack_clauses(clauses: Iterable[list[int]], literals: array.array = None) -> array.array:
+        """This function appends the clauses to an array of literals in which every clause is terminated by 0 (as
+        in the DIMACS format) and returns the array. This needs about 4 bytes per literal instead of the about 40
+        bytes of a list of Python integers."""
+        if literals is None:
+            literals = array.array("i")
+        for clause in clauses:
+            literals.extend(clause)
+            literals.append(0)
+        return literals
+
+    @staticmethod
+    def unpack_clauses(literals: array.array, chunk_size: int = 65536) -> Iterator[list[int]]:
+        """This function lazily reads the clauses stored by pack_clauses; only one chunk of the literals is
+        converted to Python integers at any time."""
+        clause = []
+        for start in range(0, len(literals), chunk_size):
+            for literal in literals[start:start + chunk_size].tolist():
+                if literal == 0:
+                    yield clause
+                    clause = []
+                else:
+                    clause.append(literal)
+
+    def abort(self) -> None:
+        """This function closes the output file without writing the header line and deletes it."""
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.output_file):
+            os.remove(self.output_file)
+
+    @staticmethod
+    def read_clauses(input_file: str) -> Iterator[list[int]]:
+        """This function lazily reads the clauses of a DIMACS file with one clause per line (as written by this
+        class), e.g., to hand them to a SAT solver without materializing the whole formula as Python lists."""
+        with open(input_file, "r") as f:
+            for line in f:
+                if line.startswith("p") or line.startswith("c"):
+                    continue
+                literals = [int(literal) for literal in line.split()]
+                if literals:
+                    yield literals[:-1]
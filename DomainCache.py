@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+
+class DomainCache:
+    """This class stores the election domain and the feasibility tables computed for a configuration (ballots,
+    committees, profiles, feasible committees, and lookup tables) as NumPy arrays in a cache directory, so that
+    later runs with the same configuration can load them instead of recomputing them. Every configuration gets
+    its own subdirectory whose name is a hash of the parameters and of the source code of the classes computing
+    the arrays; hence, changing the code automatically invalidates old entries. Arrays are loaded via memory
+    mapping. If the cache grows beyond its maximal size, the least recently used entries are removed."""
+
+    SOURCE_FILES = ["PAPPElectionBuilder.py", "AxiomHelper.py", "DataManager.py", "FormulaConstructor.py",
+                    "DomainCache.py"]
+    'The cached arrays depend on the code in these files.'
+
+    def __init__(self, cache_directory: str, maximal_size: int):
+        self.cache_directory = cache_directory
+        self.maximal_size = maximal_size
+        os.makedirs(cache_directory, exist_ok=True)
+
+    def compute_key(self, parameters: dict) -> str:
+        """This function computes the name of the cache entry of the given parameters."""
+        digest = hashlib.sha256(json.dumps(parameters, sort_keys=True).encode("utf-8"))
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for source_file in self.SOURCE_FILES:
+            with open(os.path.join(directory, source_file), "rb") as f:
+                digest.update(f.read())
+        return digest.hexdigest()
+
+    def load(self, key: str) -> dict[str, np.ndarray]:
+        """This function returns the arrays stored under the given key (as read-only memory maps) or None if there
+        is no such entry. Loading an entry marks it as recently used."""
+        entry_directory = os.path.join(self.cache_directory, key)
+        if not os.path.isdir(entry_directory):
+            return None
+        try:
+            arrays = {file_name[:-len(".npy")]: np.load(os.path.join(entry_directory, file_name), mmap_mode="r")
+                      for file_name in os.listdir(entry_directory) if file_name.endswith(".npy")}
+            os.utime(entry_directory)
+        except (OSError, ValueError):
+            'The entry was removed or damaged by a concurrent run; it is recomputed.'
+            return None
+        return arrays
+
+    def store(self, key: str, arrays: dict[str, np.ndarray]) -> bool:
+        """This function stores the arrays under the given key and removes least recently used entries until the
+        cache fits into its maximal size. The entry is written into a temporary directory first and then renamed,
+        so concurrent runs never see incomplete entries. Entries that alone exceed the maximal size are not
+        stored; the return value states whether the entry was stored."""
+        if sum(array.nbytes for array in arrays.values()) > self.maximal_size:
+            return False
+        temporary_directory = tempfile.mkdtemp(prefix=".tmp-", dir=self.cache_directory)
+        for name, array in arrays.items():
+            np.save(os.path.join(temporary_directory, name + ".npy"), array)
+        try:
+            os.rename(temporary_directory, os.path.join(self.cache_directory, key))
+        except OSError:
+            'Another run has stored the same entry in the meantime.'
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+        self._evict(key)
+        return True
+
+    def _evict(self, protected_key: str) -> None:
+        """This function removes the least recently used entries (except the protected one) until the total size of
+        the cache is at most its maximal size."""
+        entries = []
+        for key in os.listdir(self.cache_directory):
+            entry_directory = os.path.join(self.cache_directory, key)
+            if key.startswith(".") or not os.path.isdir(entry_directory):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(entry_directory, file_name))
+                           for file_name in os.listdir(entry_directory))
+                entries.append((os.path.getmtime(entry_directory), key, size))
+            except OSError:
+                continue
+        total_size = sum(size for _, _, size in entries)
+        for _, key, size in sorted(entries):
+            if total_size <= self.maximal_size:
+                break
+            if key != protected_key:
+                shutil.rmtree(os.path.join(self.cache_directory, key), ignore_errors=True)
+                total_size -= size
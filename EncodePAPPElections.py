@@ -1,4 +1,8 @@
 from FormulaConstructor import FormulaConstructor
+from CardinalityEncoder import CardinalityEncoder
+from StatisticsCollector import StatisticsCollector
+from DomainCache import DomainCache
+from SymmetryBreaker import SymmetryBreaker
 import argparse
 
 if __name__ == '__main__':
@@ -19,16 +23,101 @@ if __name__ == '__main__':
                              + "if m or n are modified this should be off (by default off)",
                         action="store_true", default=False)
 
+    parser.add_argument("--auto-symmetry-breaking",
+                        help="If specified, the program will detect the permutations of the parties that map the formula "
+                             + "onto itself and encode lex-leader constraints for them; this works for all parameters but "
+                             + "cannot be combined with --SymmetryBreaking (by default off)",
+                        action="store_true", default=False)
+    parser.add_argument("--symmetry-breaking-depth", type=int, default=SymmetryBreaker.DEFAULT_DEPTH,
+                        help="maximal number of variables compared by the lex-leader constraint of each permutation; 0 "
+                             + "means no limit (" + str(SymmetryBreaker.DEFAULT_DEPTH) + " by default)")
+
     parser.add_argument("--PO",
                         help="If specified, the program will additionally encode that the P-APP voting rule satisfies Pareto-optimality (by default off)",
                         action="store_true", default=False)
 
     parser.add_argument("--allprofiles", help="If specified, the program will consider the domain of all profiles; otherwise, we will focus on the "
                                                + "domain A_{SAT} specified in [1]", action="store_true", default=False)
+    parser.add_argument("--max-party-approvals", type=int, default=4,
+                        help="maximal approval score of a party in the profiles of the domain A_{SAT} (4 by default); "
+                             + "ignored if --allprofiles is specified")
+    parser.add_argument("--max-total-approvals", type=int, default=11,
+                        help="maximal sum of the approval scores of all parties in the profiles of the domain A_{SAT} "
+                             + "(11 by default); ignored if --allprofiles is specified")
+    parser.add_argument("--amo-encoding", choices=CardinalityEncoder.AMO_ENCODINGS, default="pairwise",
+                        help="encoding of the at-most-one part of the constraint that every profile is mapped to exactly "
+                             + "one committee; all encodings except pairwise introduce auxiliary variables (pairwise "
+                             + "by default)")
+    parser.add_argument("--sp-encoding", choices=FormulaConstructor.SP_ENCODINGS, default="direct",
+                        help="encoding of strategy-proofness: direct forbids every pair of committees that admits a "
+                             + "manipulation, threshold introduces auxiliary variables stating that the chosen committee "
+                             + "contains at least t members approved by a ballot (direct by default)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of worker processes used to generate the strategy-proofness constraints; "
+                             + "the output does not depend on this number (1 by default)")
     parser.add_argument("--SATsolve", help="If specified, the program will evaluate whether the constructed formula is true; "
                                             + "this requires the pycosat package (by default off)", action="store_true", default=False)
 
+    parser.add_argument("--lazy", help="If specified, the program will decide the satisfiability of the formula by "
+                                        + "only encoding the profiles that are needed, starting with the domain "
+                                        + "A_{SAT}; this is useful with --allprofiles and implies --SATsolve (by "
+                                        + "default off)", action="store_true", default=False)
+    parser.add_argument("--solver-jobs", type=int, default=1,
+                        help="number of SAT solver processes; if larger than one, a portfolio of differently "
+                             + "shuffled formulas is solved in parallel and the first answer wins (1 by default)")
+    parser.add_argument("--solver-timeout", type=float, default=None,
+                        help="timeout of the SAT solver in seconds (with --lazy, for all rounds together); if it is "
+                             + "reached, the result is unknown (none by default)")
+    parser.add_argument("--group-mus", help="If specified and the formula is unsatisfiable, the program will shrink "
+                                             + "the profiles to a minimal set whose formula is unsatisfiable and "
+                                             + "write it to OutputFile.mus; this implies --SATsolve (by default off)",
+                        action="store_true", default=False)
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="If specified, the domain and the feasible committees are stored in this directory and "
+                             + "loaded from it by later runs with the same parameters (by default off)")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="maximal size of the cache directory in MiB; the least recently used entries are "
+                             + "removed if it is exceeded (1024 by default)")
+    parser.add_argument("--stats", help="If specified, the program will print the wall time, the peak memory, and the "
+                                         + "counts of profiles, committees, variables, and clauses of every phase "
+                                         + "(by default off)", action="store_true", default=False)
+    parser.add_argument("--stats-json", type=str, default=None, metavar="FILE",
+                        help="If specified, the statistics of every phase will additionally be written as JSON into "
+                             + "this file")
+    parser.add_argument("--trace-memory", help="If specified, the peak memory of every phase is traced with "
+                                                + "tracemalloc; this slows down the program considerably (by default "
+                                                + "off, in which case only the maximal resident set size is reported)",
+                        action="store_true", default=False)
+
     args = parser.parse_args()
+    if args.SymmetryBreaking and args.auto_symmetry_breaking:
+        parser.error("--SymmetryBreaking and --auto-symmetry-breaking cannot be combined")
+    if args.symmetry_breaking_depth < 0:
+        parser.error("--symmetry-breaking-depth must not be negative")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.solver_jobs < 1:
+        parser.error("--solver-jobs must be at least 1")
+    if args.solver_timeout is not None and args.solver_timeout <= 0:
+        parser.error("--solver-timeout must be positive")
+    symmetry_breaking_depth = args.symmetry_breaking_depth if args.symmetry_breaking_depth > 0 else None
 
-    formula_constructor = FormulaConstructor(args.k, args.m, args.n, args.PO, args.cleverWR, args.allprofiles)
-    formula_constructor.write_formula(args.OutputFile, args.SATsolve, args.SymmetryBreaking)
+    statistics = StatisticsCollector(args.stats or args.stats_json is not None, args.trace_memory)
+    statistics.parameters = vars(args)
+    formula_constructor = FormulaConstructor(args.k, args.m, args.n, args.PO, args.cleverWR, args.allprofiles,
+                                             args.max_party_approvals, args.max_total_approvals, args.amo_encoding,
+                                             args.sp_encoding, statistics,
+                                             DomainCache(args.cache_dir, args.cache_size * 2 ** 20)
+                                             if args.cache_dir is not None else None)
+    if args.lazy:
+        formula_constructor.solve_lazily(args.OutputFile, args.SymmetryBreaking, args.auto_symmetry_breaking,
+                                         symmetry_breaking_depth, args.group_mus, args.solver_jobs,
+                                         args.solver_timeout)
+    else:
+        formula_constructor.write_formula(args.OutputFile, args.SATsolve or args.group_mus, args.SymmetryBreaking,
+                                          args.jobs, args.auto_symmetry_breaking, symmetry_breaking_depth,
+                                          args.solver_jobs, args.solver_timeout, args.group_mus)
+    if args.stats:
+        print(statistics.format_table())
+    if args.stats_json is not None:
+        statistics.write_json(args.stats_json)
@@ -1,96 +1,497 @@
+import numpy as np
 import pycosat
 
 from PAPPElectionBuilder import PAPPElectionBuilder
 from AxiomHelper import AxiomHelper
 from DataManager import DataManager
+from DimacsWriter import DimacsWriter
+from AssignmentDecoder import AssignmentDecoder
+from CardinalityEncoder import CardinalityEncoder
+from StatisticsCollector import StatisticsCollector
+from DomainCache import DomainCache
+from LazyDomainSolver import LazyDomainSolver
+from SymmetryBreaker import SymmetryBreaker
+from SolverPortfolio import SolverPortfolio
+from GroupMUSExtractor import GroupMUSExtractor
+from typing import Iterable, Iterator
 import itertools
+import multiprocessing
+
+_worker_formula_constructor = None
+'Formula constructor used by the worker processes that generate the strategy-proofness constraints in parallel.'
+
+
+def _initialize_worker(formula_constructor: "FormulaConstructor") -> None:
+    """Stores the formula constructor in the worker process."""
+    global _worker_formula_constructor
+    _worker_formula_constructor = formula_constructor
+
+
+def _write_strategyproofness_shard(profile_indices: range) -> tuple[bytes, int, int]:
+    """Generates the strategy-proofness constraints of a shard of true profiles in a worker process and returns
+    them already formatted as DIMACS lines."""
+    clauses = list(_worker_formula_constructor.write_strategyproofness_constraint(profile_indices))
+    return DimacsWriter.format_clauses(clauses)
 
 
 class FormulaConstructor:
 
+    SP_ENCODINGS = ["direct", "threshold"]
+    'The direct encoding forbids pairs of committees; the threshold encoding uses auxiliary threshold variables.'
+
     def __init__(self, committee_size: int, number_of_parties: int, number_of_voters: int, pareto_optimality: bool,
                  cleverWR: bool,
-                 all_profiles: bool):
-        self.election_builder = PAPPElectionBuilder(committee_size, number_of_parties, number_of_voters, all_profiles)
-        self.ballots = self.election_builder.compute_approval_ballots()
-        self.committees = self.election_builder.compute_all_committees()
-        self.profiles = self.election_builder.compute_approval_profiles(self.ballots)
+                 all_profiles: bool, max_approvals_per_party: int = 4, max_total_approvals: int = 11,
+                 amo_encoding: str = "pairwise", sp_encoding: str = "direct",
+                 statistics: StatisticsCollector = None, cache: DomainCache = None):
+        self.statistics = statistics if statistics is not None else StatisticsCollector(enabled=False)
+        'The statistics collector measures every phase of the construction; by default, it is disabled.'
+        self.election_builder = PAPPElectionBuilder(committee_size, number_of_parties, number_of_voters,
+                                                    all_profiles, max_approvals_per_party, max_total_approvals)
         self.axiom_helper = AxiomHelper(committee_size, number_of_parties,
                                         number_of_voters, pareto_optimality, cleverWR)
-        self.feasible_committees_for_all_profiles = \
-            self.axiom_helper.compute_feasible_committees_for_all_profiles(self.profiles, self.committees, self.ballots)
-        self.data_manager = \
-            DataManager(self.ballots, self.committees, self.profiles, self.feasible_committees_for_all_profiles)
+        cached_arrays = None
+        if cache is not None:
+            cache_key = cache.compute_key({"k": committee_size, "m": number_of_parties, "n": number_of_voters,
+                                           "PO": pareto_optimality, "cleverWR": cleverWR, "allprofiles": all_profiles,
+                                           "max_approvals_per_party": None if all_profiles else max_approvals_per_party,
+                                           "max_total_approvals": None if all_profiles else max_total_approvals})
+            with self.statistics.measure("cache load") as phase:
+                cached_arrays = cache.load(cache_key)
+                if cached_arrays is not None:
+                    self._restore_domain(cached_arrays)
+                    phase.update(profiles=len(self.profiles))
+                phase.update(hit=cached_arrays is not None)
+        if cached_arrays is None:
+            with self.statistics.measure("enumeration") as phase:
+                self.ballots = self.election_builder.compute_approval_ballots()
+                self.committees = self.election_builder.compute_all_committees()
+                self.profiles = self.election_builder.compute_approval_profiles(self.ballots)
+                phase.update(ballots=len(self.ballots), committees=len(self.committees), profiles=len(self.profiles))
+            with self.statistics.measure("feasibility") as phase:
+                self.numbers_of_approvals = self.axiom_helper.compute_numbers_of_approvals(self.committees,
+                                                                                           self.ballots)
+                self.feasible_committees_for_all_profiles = \
+                    self.axiom_helper.compute_feasible_committees_for_all_profiles(self.profiles, self.committees,
+                                                                                   self.ballots,
+                                                                                   self.numbers_of_approvals)
+                phase.update(feasible_pairs=sum(len(feasible_committees) for feasible_committees
+                                                in self.feasible_committees_for_all_profiles))
+        with self.statistics.measure("data manager") as phase:
+            self.data_manager = \
+                DataManager(self.ballots, self.committees, self.profiles, self.feasible_committees_for_all_profiles,
+                            self.numbers_of_approvals,
+                            cached_arrays.get("profile_ranks") if cached_arrays is not None else None)
+            self._allocate_auxiliary_variables(amo_encoding, sp_encoding)
+            phase.update(variables=self.data_manager.number_of_variables)
+        if cache is not None and cached_arrays is None:
+            with self.statistics.measure("cache store") as phase:
+                phase.update(stored=cache.store(cache_key, self._export_domain()))
+
+    def _export_domain(self) -> dict[str, np.ndarray]:
+        """This function returns the domain, the feasible committees, and the profile ranks as arrays for the
+        DomainCache. The feasible committees of all profiles are concatenated; the offsets state where the
+        committees of each profile start."""
+        numbers_of_feasible_committees = np.fromiter((len(feasible_committees) for feasible_committees
+                                                      in self.feasible_committees_for_all_profiles), dtype=np.int64)
+        arrays = {"ballots": np.array(self.ballots, dtype=np.int64), "committees": self.committees,
+                  "profiles": self.profiles, "numbers_of_approvals": self.numbers_of_approvals,
+                  "feasible_committees": np.fromiter(itertools.chain.from_iterable(
+                      self.feasible_committees_for_all_profiles), dtype=np.int32),
+                  "feasible_committee_offsets": np.concatenate(([0], np.cumsum(numbers_of_feasible_committees)))}
+        profile_ranks = self.data_manager.export_profile_ranks()
+        if profile_ranks is not None:
+            arrays["profile_ranks"] = profile_ranks
+        return arrays
+
+    def _restore_domain(self, arrays: dict[str, np.ndarray]) -> None:
+        """This function restores the domain and the feasible committees from the arrays of _export_domain."""
+        self.ballots = arrays["ballots"].tolist()
+        self.committees = arrays["committees"]
+        self.profiles = arrays["profiles"]
+        self.numbers_of_approvals = arrays["numbers_of_approvals"]
+        feasible_committees = arrays["feasible_committees"].tolist()
+        offsets = arrays["feasible_committee_offsets"].tolist()
+        self.feasible_committees_for_all_profiles = [feasible_committees[start:end]
+                                                     for start, end in zip(offsets, offsets[1:])]
 
-    def write_papp_function_constraints(self) -> list[list[int]]:
+    def _allocate_auxiliary_variables(self, amo_encoding: str, sp_encoding: str) -> None:
+        """This function reserves the auxiliary variables of the exactly-one constraints and, if the threshold
+        encoding of strategy-proofness is selected, the threshold variables."""
+        self.cardinality_encoder = CardinalityEncoder(amo_encoding)
+        numbers_of_amo_auxiliary_variables = [self.cardinality_encoder.number_of_auxiliary_variables(
+            len(feasible_committees)) for feasible_committees in self.feasible_committees_for_all_profiles]
+        self.number_of_amo_auxiliary_variables = sum(numbers_of_amo_auxiliary_variables)
+        self.first_amo_auxiliary_variables = \
+            self.data_manager.allocate_auxiliary_variables(numbers_of_amo_auxiliary_variables)
+        if sp_encoding not in self.SP_ENCODINGS:
+            raise ValueError("Unknown strategy-proofness encoding " + sp_encoding + "; expected one of "
+                             + ", ".join(self.SP_ENCODINGS))
+        self.sp_encoding = sp_encoding
+        self.number_of_threshold_variables = 0
+        if sp_encoding == "threshold":
+            self.maximal_thresholds = self._compute_maximal_thresholds()
+            self.number_of_threshold_variables = int(self.maximal_thresholds.sum(dtype=np.int64))
+            self.first_threshold_variables = np.array(self.data_manager.allocate_auxiliary_variables(
+                self.maximal_thresholds.ravel().tolist()), dtype=np.int64).reshape(self.maximal_thresholds.shape)
+
+    def write_papp_function_constraints(self) -> Iterator[list[int]]:
         """This function writes the constraints specifying that the variables indeed encode a logical formula.
         Since we already filtered out all committees that violate weak representation (and, depending on the
         input parameters, some other axioms) for all profiles, this function also encodes that the function
-        satisfies weak representation (and all other input axioms)."""
-        formula = list()
-        for profile in self.profiles:
-            feasible_committees = self.data_manager.get_feasible_committees_for_profile(profile)
-            formula.append([self.data_manager.get_variable(profile, committee) for committee in feasible_committees])
-            if len(feasible_committees) > 1:
-                for [committee1, committee2] in list(itertools.combinations(feasible_committees, 2)):
-                    formula.append([-self.data_manager.get_variable(profile, committee1),
-                                    -self.data_manager.get_variable(profile, committee2)])
-        return formula
-
-    def write_strategyproofness_constraint(self) -> list[list[int]]:
-        """This function writes the strategy-proofness constraints as described in [1]"""
-        formula = []
-        already_written = set()
-        'In this set, we keep track of constraints we have already written to avoid duplication'
-        for true_profile in self.profiles:
-            true_feasible_committees = self.data_manager.get_feasible_committees_for_profile(true_profile)
-            for manipulator in range(0, len(true_profile)):
-                for ballot in self.ballots:
-                    if ballot != true_profile[manipulator]:
-                        manipulated_profile = true_profile.copy()
-                        manipulated_profile[manipulator] = ballot
-                        'after the manipulation, we may have to reorder the voters to find the canonical representative'
-                        manipulated_profile = self.data_manager.get_anonymous_profile(manipulated_profile)
-                        if self.data_manager.is_profile_known(manipulated_profile):
-                            manipulated_feasible_committees = \
-                                self.data_manager.get_feasible_committees_for_profile(manipulated_profile)
-                            for committee1 in true_feasible_committees:
-                                for committee2 in manipulated_feasible_committees:
-                                    if self.data_manager.voter_prefers_committee1_to_committee2(ballot, committee1,
-                                                                                                committee2):
-                                        constraint = [-self.data_manager.get_variable(true_profile, committee1),
-                                                      -self.data_manager.get_variable(manipulated_profile, committee2)]
-                                        if tuple(constraint) not in already_written:
-                                            formula.append(constraint)
-                                            already_written.add(tuple(constraint))
-        return formula
+        satisfies weak representation (and all other input axioms). The clauses are generated lazily; the
+        at-most-one part is encoded as selected by the amo_encoding parameter."""
+        for profile_index in range(0, len(self.profiles)):
+            yield from self._write_exactly_one_constraint(profile_index)
+
+    def _write_exactly_one_constraint(self, profile_index: int) -> list[list[int]]:
+        """This function writes the clauses stating that the given profile is mapped to exactly one of its feasible
+        committees."""
+        first_variable = self.data_manager.get_first_variable(profile_index)
+        variables = list(range(first_variable, first_variable
+                               + len(self.data_manager.get_feasible_committees_for_profile(profile_index))))
+        return self.cardinality_encoder.encode_exactly_one(variables, self.first_amo_auxiliary_variables[profile_index])
+
+    def compute_manipulations(self, true_profile_index: int, true_profile: list[int]) \
+            -> Iterator[tuple[int, int, int]]:
+        """This function lazily computes all manipulations of the true profile that stay within the domain: it
+        yields the ballot of the manipulator in the true profile, the new ballot of the manipulator, and the index
+        of the manipulated profile. Voters with the same ballot lead to the same manipulated profiles, so we only
+        consider the first voter of each ballot; this way, every pair of profiles and ballot is generated exactly
+        once."""
+        for manipulator in range(0, len(true_profile)):
+            if manipulator > 0 and true_profile[manipulator] == true_profile[manipulator - 1]:
+                continue
+            for ballot in range(0, len(self.ballots)):
+                if ballot != true_profile[manipulator]:
+                    'The manipulated profile is found by ranking the canonical representative after the manipulation.'
+                    manipulated_profile_index = self.data_manager.get_manipulated_profile_index(
+                        true_profile_index, true_profile, manipulator, ballot)
+                    if manipulated_profile_index >= 0:
+                        yield true_profile[manipulator], ballot, manipulated_profile_index
+
+    def write_profile_constraints(self, profile_index: int) -> Iterator[list[int]]:
+        """This function writes the constraints that only concern a single profile: the profile is mapped to
+        exactly one committee and, for the threshold encoding, the definitions of its threshold variables."""
+        yield from self._write_exactly_one_constraint(profile_index)
+        if self.sp_encoding == "threshold":
+            yield from self._write_threshold_definitions(profile_index)
+
+    def write_strategyproofness_constraint(self, profile_indices: Iterable[int] = None) -> Iterator[list[int]]:
+        """This function writes the strategy-proofness constraints as described in [1]. The clauses are
+        generated lazily; they are encoded as selected by the sp_encoding parameter. If profile_indices is given,
+        only the constraints whose true profile is among these profiles are written."""
+        if profile_indices is None:
+            profile_indices = range(0, len(self.profiles))
+        for true_profile_index in profile_indices:
+            if self.sp_encoding == "threshold":
+                yield from self._write_threshold_definitions(true_profile_index)
+            for _, ballot, manipulated_profile_index in \
+                    self.compute_manipulations(true_profile_index, self.profiles[true_profile_index].tolist()):
+                yield from self.write_manipulation_constraint(true_profile_index, ballot, manipulated_profile_index)
+
+    def write_manipulation_constraint(self, true_profile_index: int, ballot: int, manipulated_profile_index: int) \
+            -> Iterator[list[int]]:
+        """This function writes the constraints stating that a voter whose ballot in the manipulated profile is
+        ballot cannot benefit from deviating to the true profile, i.e., the voter does not prefer the committee
+        chosen for the true profile to the committee chosen for the manipulated profile."""
+        if self.sp_encoding == "threshold":
+            yield from self._write_threshold_manipulation_constraint(true_profile_index, ballot,
+                                                                     manipulated_profile_index)
+        else:
+            yield from self._write_direct_manipulation_constraint(true_profile_index, ballot,
+                                                                  manipulated_profile_index)
+
+    def _write_direct_manipulation_constraint(self, true_profile_index: int, ballot: int,
+                                              manipulated_profile_index: int) -> Iterator[list[int]]:
+        """This function forbids every pair of committees (c1, c2) chosen for the true and the manipulated profile
+        such that the voter with the given ballot prefers c1 to c2."""
+        true_feasible_committees = self.data_manager.get_feasible_committees_for_profile(true_profile_index)
+        true_first_variable = self.data_manager.get_first_variable(true_profile_index)
+        manipulated_feasible_committees = \
+            self.data_manager.get_feasible_committees_for_profile(manipulated_profile_index)
+        manipulated_first_variable = self.data_manager.get_first_variable(manipulated_profile_index)
+        for position1, committee1 in enumerate(true_feasible_committees):
+            for position2, committee2 in enumerate(manipulated_feasible_committees):
+                if self.data_manager.voter_prefers_committee1_to_committee2(ballot, committee1, committee2):
+                    yield [-(true_first_variable + position1), -(manipulated_first_variable + position2)]
+
+    def _compute_maximal_thresholds(self) -> np.ndarray:
+        """This function computes for every profile and ballot the maximal number of approved members that a voter
+        with this ballot can obtain from a feasible committee of the profile."""
+        maximal_thresholds = np.zeros((len(self.profiles), len(self.ballots)), dtype=np.int8)
+        for profile_index in range(0, len(self.profiles)):
+            feasible_committees = self.data_manager.get_feasible_committees_for_profile(profile_index)
+            if feasible_committees:
+                maximal_thresholds[profile_index] = self.numbers_of_approvals[:, feasible_committees].max(axis=1)
+        return maximal_thresholds
+
+    def _write_threshold_definitions(self, profile_index: int) -> Iterator[list[int]]:
+        """The threshold variable y(p, b, t) states that the committee chosen for profile p contains at least t
+        members approved by ballot b, for 1 <= t <= the maximal threshold of p and b. This function writes the
+        clauses x(p, c) -> y(p, b, t) for t = number of members of c approved by b, y(p, b, t) -> y(p, b, t - 1),
+        and y(p, b, t) -> OR of x(p, c) over the committees c that give at least t approved members to b. The
+        latter clauses are only needed if y(p, b, t) can occur on the right-hand side of a manipulation, i.e., if a
+        voter in p has ballot b."""
+        feasible_committees = self.data_manager.get_feasible_committees_for_profile(profile_index)
+        ballots_in_profile = set(self.profiles[profile_index].tolist())
+        first_variable = self.data_manager.get_first_variable(profile_index)
+        maximal_thresholds = self.maximal_thresholds[profile_index].tolist()
+        first_threshold_variables = self.first_threshold_variables[profile_index].tolist()
+        for ballot in range(0, len(self.ballots)):
+            first_threshold_variable = first_threshold_variables[ballot]
+            numbers_of_approvals = [self.data_manager.get_number_of_approved_members(ballot, committee)
+                                    for committee in feasible_committees]
+            for position, number_of_approvals in enumerate(numbers_of_approvals):
+                if number_of_approvals > 0:
+                    yield [-(first_variable + position), first_threshold_variable + number_of_approvals - 1]
+            for threshold in range(1, maximal_thresholds[ballot] + 1):
+                threshold_variable = first_threshold_variable + threshold - 1
+                if threshold > 1:
+                    yield [-threshold_variable, threshold_variable - 1]
+                if ballot in ballots_in_profile:
+                    yield [-threshold_variable] + [first_variable + position for position, number_of_approvals
+                                                   in enumerate(numbers_of_approvals) if number_of_approvals >= threshold]
+
+    def _write_threshold_manipulation_constraint(self, true_profile_index: int, ballot: int,
+                                                 manipulated_profile_index: int) -> Iterator[list[int]]:
+        """This function writes the clauses y(true profile, ballot, t) -> y(manipulated profile, ballot, t) for
+        all thresholds t. Hence, every manipulation costs at most k clauses instead of one clause per pair of
+        committees."""
+        true_maximal_threshold = int(self.maximal_thresholds[true_profile_index, ballot])
+        true_first_threshold_variable = int(self.first_threshold_variables[true_profile_index, ballot])
+        manipulated_maximal_threshold = int(self.maximal_thresholds[manipulated_profile_index, ballot])
+        manipulated_first_threshold_variable = int(self.first_threshold_variables[manipulated_profile_index, ballot])
+        for threshold in range(1, true_maximal_threshold + 1):
+            true_threshold_variable = true_first_threshold_variable + threshold - 1
+            if threshold <= manipulated_maximal_threshold:
+                yield [-true_threshold_variable, manipulated_first_threshold_variable + threshold - 1]
+            else:
+                'No feasible committee of the manipulated profile reaches the threshold.'
+                yield [-true_threshold_variable]
 
     def write_symmetry_breaking_clause(self) -> list[list[int]]:
         """Specifies the symmetry-breaking clause as discussed by Lemma 2 in [1]."""
         tie_breaking_profile = [{0}, {0, 1}, {1}, {2}, {2, 3}, {3}]
-        tie_breaking_profile = self.data_manager.get_anonymous_profile(tie_breaking_profile)
-        allowed_committees = [[0, 0, 2], [0, 1, 2]]
-        return [[self.data_manager.get_variable(tie_breaking_profile, committee) for committee in allowed_committees]]
-
-    def write_formula(self, output_file: str, sat_solve: bool, symmetry_breaking: bool) -> None:
-        """This function writes the logical formula in the output file. If sat_solve is true, it
-        also calls a SAT solver to check whether the logical formula is unsatisfiable."""
-        formula = []
-        if symmetry_breaking:
-            formula = self.write_symmetry_breaking_clause()
-        formula.extend(self.write_papp_function_constraints())
-        formula.extend(self.write_strategyproofness_constraint())
+        tie_breaking_profile = self.data_manager.get_anonymous_profile(
+            [self.data_manager.get_ballot_index(self.election_builder.parties_to_ballot(ballot))
+             for ballot in tie_breaking_profile])
+        tie_breaking_profile_index = self.data_manager.get_profile_index(tie_breaking_profile)
+        allowed_committees = [self.data_manager.get_committee_index(self.election_builder.parties_to_committee(committee))
+                              for committee in [[0, 0, 2], [0, 1, 2]]]
+        'Committees that are infeasible for the profile have no variable and are thus already excluded.'
+        return [[self.data_manager.get_variable(tie_breaking_profile_index, committee) for committee in allowed_committees
+                 if committee in self.data_manager.get_feasible_committees_for_profile(tie_breaking_profile_index)]]
+
+    def write_automatic_symmetry_breaking_clauses(self, depth: int = SymmetryBreaker.DEFAULT_DEPTH) \
+            -> list[list[int]]:
+        """This function detects the permutations of the parties that map the formula onto itself and returns
+        lex-leader constraints for them that compare at most depth variables each (see SymmetryBreaker). In contrast
+        to write_symmetry_breaking_clause, this works for all parameters."""
+        symmetry_breaker = SymmetryBreaker(self)
+        symmetries = symmetry_breaker.compute_symmetries()
+        print("Automatic symmetry breaking found " + str(len(symmetries)) + " permutations of the parties that map "
+              + "the formula onto itself.")
+        return symmetry_breaker.write_lex_leader_constraints(symmetries, depth)
+
+    def _write_symmetry_breaking_clauses(self, symmetry_breaking: bool, automatic_symmetry_breaking: bool,
+                                         symmetry_breaking_depth: int) -> list[list[int]]:
+        """This function returns the clauses of the selected kinds of symmetry breaking."""
+        if not symmetry_breaking and not automatic_symmetry_breaking:
+            return []
+        if symmetry_breaking and automatic_symmetry_breaking:
+            raise ValueError("The symmetry-breaking clause of [1] and the automatic symmetry breaking may exclude "
+                             + "each other's solutions and cannot be combined.")
+        with self.statistics.measure("symmetry breaking") as phase:
+            if symmetry_breaking:
+                clauses = self.write_symmetry_breaking_clause()
+            else:
+                clauses = self.write_automatic_symmetry_breaking_clauses(symmetry_breaking_depth)
+            phase.update(clauses=len(clauses))
+        return clauses
+
+    def format_profile(self, profile_index: int) -> str:
+        """Returns a readable representation of the profile with the given index, e.g., {0} {0,1} {2}."""
+        return " ".join("{" + ",".join(str(party) for party in
+                                       sorted(self.election_builder.ballot_to_parties(self.ballots[ballot_index]))) + "}"
+                        for ballot_index in self.profiles[profile_index].tolist())
+
+    def format_committee(self, committee_index: int) -> str:
+        """Returns a readable representation of the committee with the given index, e.g., [0, 0, 2]."""
+        return str(self.election_builder.committee_to_parties(self.committees[committee_index]))
+
+    def write_variable_mapping(self, mapping_file: str, renaming: np.ndarray = None) -> None:
+        """This function writes for every variable that encodes a profile and a committee (i.e., every variable
+        except the auxiliary ones) the profile and the committee into the mapping file, which can be used by
+        AssignmentDecoder to decode the solutions of SAT solvers. If a renaming of the variables is given (see
+        LazyDomainSolver.compute_compact_renaming), only the profiles whose variables are kept are listed, with the
+        new variable numbers."""
+        committee_names = [self.format_committee(committee_index) for committee_index in range(0, len(self.committees))]
+        with open(mapping_file, "w") as f:
+            f.write("c variable\tprofile\tcommittee\n")
+            for profile_index in range(0, len(self.profiles)):
+                first_variable = self.data_manager.get_first_variable(profile_index)
+                if renaming is not None:
+                    if renaming[first_variable] == 0:
+                        continue
+                    first_variable = int(renaming[first_variable])
+                profile_name = self.format_profile(profile_index)
+                lines = [str(first_variable + position) + "\t" + profile_name + "\t" + committee_names[committee_index]
+                         + "\n" for position, committee_index in
+                         enumerate(self.data_manager.get_feasible_committees_for_profile(profile_index))]
+                f.write("".join(lines))
+
+    def _compute_shards(self, jobs: int) -> list[range]:
+        """This function splits the profile list into contiguous shards for the parallel clause generation.
+        We use several shards per worker so that the load is balanced even though profiles differ in cost."""
+        shard_size = max(1, -(-len(self.profiles) // (16 * jobs)))
+        return [range(start, min(start + shard_size, len(self.profiles)))
+                for start in range(0, len(self.profiles), shard_size)]
+
+    def _solve_formula_file(self, input_file: str, solver_jobs: int, solver_timeout: float):
+        """This function solves the formula in the input file with pycosat, or with a SolverPortfolio if several
+        solver jobs or a timeout are specified. It returns a satisfying assignment, "UNSAT", or "UNKNOWN"."""
+        if solver_jobs <= 1 and solver_timeout is None:
+            return pycosat.solve(DimacsWriter.read_clauses(input_file))
+        portfolio = SolverPortfolio(solver_jobs, solver_timeout)
+        assignment = portfolio.solve(input_file)
+        if assignment != "UNKNOWN":
+            print("Configuration " + str(portfolio.winning_configuration) + " of the solver portfolio answered first.")
+        return assignment
+
+    def write_group_mus(self, output_file: str, profile_indices: list[int], background_clauses: list[list[int]],
+                        jobs: int = 1) -> None:
+        """This function shrinks the given profiles, whose formula is unsatisfiable, to a minimal set of profiles
+        whose formula is unsatisfiable (see GroupMUSExtractor). The background clauses are part of every tested
+        formula. The formula restricted to these profiles is written to output_file.mus.cnf, and the profiles are
+        listed in output_file.mus."""
+        with self.statistics.measure("group MUS") as phase:
+            extractor = GroupMUSExtractor(self, profile_indices, background_clauses, jobs)
+            mus = extractor.extract(profile_indices)
+            phase.update(profiles=len(mus), tests=extractor.number_of_tests)
+        with DimacsWriter(output_file + ".mus.cnf") as writer:
+            writer.write_clauses(extractor.write_clauses(mus))
+        with open(output_file + ".mus", "w") as f:
+            f.write("".join(self.format_profile(profile_index) + "\n" for profile_index in mus))
+        print("The formula restricted to the " + str(len(mus)) + " profiles listed in " + output_file + ".mus is "
+              + "unsatisfiable, but it becomes satisfiable if any of them is removed (" + str(extractor.number_of_tests)
+              + " tests). It has " + str(writer.number_of_clauses) + " clauses and was written to " + output_file
+              + ".mus.cnf")
+
+    def write_formula(self, output_file: str, sat_solve: bool, symmetry_breaking: bool, jobs: int = 1,
+                      automatic_symmetry_breaking: bool = False,
+                      symmetry_breaking_depth: int = SymmetryBreaker.DEFAULT_DEPTH, solver_jobs: int = 1,
+                      solver_timeout: float = None, group_mus: bool = False) -> None:
+        """This function streams the logical formula into the output file and writes the mapping from the
+        variables to profiles and committees into output_file.map. If sat_solve is true, it also calls a SAT solver
+        to check whether the logical formula is unsatisfiable; if it is satisfiable, the encoded P-APP voting rule is
+        written to output_file.rule. If jobs is larger than one, the strategy-proofness constraints are generated
+        by a pool of worker processes; since the shards are merged in the order of the profiles, the output does
+        not depend on the number of workers. The symmetry-breaking clauses (see _write_symmetry_breaking_clauses) are
+        written first. The formula is solved by a portfolio of solver_jobs processes if solver_jobs is larger than
+        one or a solver timeout is given. If group_mus is true and the formula is unsatisfiable, a minimal
+        unsatisfiable set of profiles is extracted with solver_jobs processes (see write_group_mus)."""
+        symmetry_breaking_clauses = self._write_symmetry_breaking_clauses(symmetry_breaking,
+                                                                          automatic_symmetry_breaking,
+                                                                          symmetry_breaking_depth)
+        with DimacsWriter(output_file) as writer:
+            writer.write_clauses(symmetry_breaking_clauses)
+            with self.statistics.measure("function clauses") as phase:
+                number_of_clauses = writer.number_of_clauses
+                writer.write_clauses(self.write_papp_function_constraints())
+                number_of_function_clauses = writer.number_of_clauses - number_of_clauses
+                phase.update(clauses=number_of_function_clauses,
+                             auxiliary_variables=self.number_of_amo_auxiliary_variables)
+            with self.statistics.measure("strategy-proofness clauses") as phase:
+                number_of_clauses = writer.number_of_clauses
+                if jobs > 1:
+                    with multiprocessing.Pool(jobs, initializer=_initialize_worker, initargs=(self,)) as pool:
+                        for formatted_clauses in pool.imap(_write_strategyproofness_shard, self._compute_shards(jobs)):
+                            writer.write_formatted_clauses(*formatted_clauses)
+                else:
+                    writer.write_clauses(self.write_strategyproofness_constraint())
+                number_of_strategyproofness_clauses = writer.number_of_clauses - number_of_clauses
+                phase.update(clauses=number_of_strategyproofness_clauses,
+                             auxiliary_variables=self.number_of_threshold_variables)
+        print("The formula has " + str(writer.number_of_variables) + " variables and " + str(writer.number_of_clauses)
+              + " clauses; the exactly-one constraints (" + self.cardinality_encoder.amo_encoding + " encoding) use "
+              + str(number_of_function_clauses) + " clauses and "
+              + str(self.number_of_amo_auxiliary_variables) + " auxiliary variables; the strategy-proofness "
+              + "constraints (" + self.sp_encoding + " encoding) use " + str(number_of_strategyproofness_clauses)
+              + " clauses and " + str(self.number_of_threshold_variables) + " auxiliary variables.")
+        mapping_file = output_file + ".map"
+        with self.statistics.measure("variable mapping") as phase:
+            self.write_variable_mapping(mapping_file)
+            'The size of the written formula, including all auxiliary and symmetry-breaking variables and clauses.'
+            phase.update(variables=writer.number_of_variables, clauses=writer.number_of_clauses)
         if sat_solve:
-            if pycosat.solve(formula) == "UNSAT":
+            with self.statistics.measure("solve") as phase:
+                assignment = self._solve_formula_file(output_file, solver_jobs, solver_timeout)
+                phase.update(variables=writer.number_of_variables, clauses=writer.number_of_clauses,
+                             result=assignment if isinstance(assignment, str) else "SAT")
+            if assignment == "UNKNOWN":
+                print("unknown (the solver timeout of " + str(solver_timeout) + " seconds was reached)")
+            elif assignment == "UNSAT":
                 print("unsatisfiable")
+                if group_mus:
+                    self.write_group_mus(output_file, list(range(0, len(self.profiles))), symmetry_breaking_clauses,
+                                         solver_jobs)
             else:
                 print("satisfiable")
-        max_var = max([max([abs(int(variable)) for variable in constraint]) for constraint in formula])
-        f = open(output_file, "w")
-        s = "p cnf " + str(max_var) + " " + str(len(formula)) + "\n"
-        f.write(s)
-        for item in formula:
-            for entry in item:
-                f.write(str(entry) + " ")
-            f.write("0\n")
-        f.close()
+                rule_file = output_file + ".rule"
+                AssignmentDecoder(mapping_file).write_table(assignment, rule_file)
+                print("The P-APP voting rule encoded by the satisfying assignment was written to " + rule_file)
+
+    def solve_lazily(self, output_file: str, symmetry_breaking: bool, automatic_symmetry_breaking: bool = False,
+                     symmetry_breaking_depth: int = SymmetryBreaker.DEFAULT_DEPTH, group_mus: bool = False,
+                     solver_jobs: int = 1, solver_timeout: float = None) -> None:
+        """This function decides whether the logical formula is satisfiable with the LazyDomainSolver, which only
+        encodes the profiles needed for the verdict, starting with the profiles of the domain A_{SAT}. The formula
+        restricted to the profiles encoded in the last round is written into the output file, with its variables
+        renumbered consecutively (the mapping file refers to this numbering); if it is unsatisfiable, it proves that
+        the formula of the whole domain is unsatisfiable. If the formula is satisfiable, the P-APP voting rule found
+        on the whole domain is written to output_file.rule. The formula of every round is solved by a portfolio of
+        solver_jobs processes if solver_jobs is larger than one or a solver timeout is given; the timeout applies to
+        all rounds together. If group_mus is true and the formula is unsatisfiable, the encoded profiles are shrunk
+        to a minimal unsatisfiable set with solver_jobs processes (see write_group_mus)."""
+        symmetry_breaking_clauses = self._write_symmetry_breaking_clauses(symmetry_breaking,
+                                                                          automatic_symmetry_breaking,
+                                                                          symmetry_breaking_depth)
+        with self.statistics.measure("counterexample-guided solve") as phase:
+            seed_profiles = LazyDomainSolver.compute_seed_profiles(self)
+            for clause in symmetry_breaking_clauses:
+                'The profiles of the symmetry-breaking clauses have to be encoded from the start.'
+                seed_profiles.extend(self.data_manager.decode_variable(abs(literal))[0] for literal in clause
+                                     if abs(literal) <= self.data_manager.number_of_committee_variables)
+            solver = LazyDomainSolver(self, seed_profiles, symmetry_breaking_clauses)
+            rule = solver.solve(solver_jobs, solver_timeout)
+            phase.update(rounds=solver.rounds, profiles=solver.number_of_active_profiles,
+                         clauses=solver.number_of_clauses, result=solver.result)
+        'The variables of the inactive profiles do not occur in the formula, so the variables are renumbered.'
+        renaming = solver.compute_compact_renaming()
+        with DimacsWriter(output_file) as writer:
+            writer.write_clauses(solver.write_renamed_clauses(renaming))
+        print("The formula restricted to " + str(solver.number_of_active_profiles) + " of " + str(len(self.profiles))
+              + " profiles has " + str(writer.number_of_variables) + " variables and " + str(writer.number_of_clauses)
+              + " clauses.")
+        mapping_file = output_file + ".map"
+        with self.statistics.measure("variable mapping") as phase:
+            self.write_variable_mapping(mapping_file, renaming)
+            'The size of the written formula, including all auxiliary and symmetry-breaking variables and clauses.'
+            phase.update(variables=writer.number_of_variables, clauses=writer.number_of_clauses)
+        if solver.result == "UNKNOWN":
+            print("unknown (the solver timeout of " + str(solver_timeout) + " seconds was reached)")
+        elif solver.result == "UNSAT":
+            print("unsatisfiable")
+            if group_mus:
+                self.write_group_mus(output_file, [profile_index for profile_index in range(0, len(self.profiles))
+                                                   if solver.active_profiles[profile_index]],
+                                     symmetry_breaking_clauses, solver_jobs)
+        else:
+            print("satisfiable")
+            rule_file = output_file + ".rule"
+            'The mapping file only covers the active profiles, so the rule is written directly.'
+            with open(rule_file, "w") as f:
+                f.write("".join(self.format_profile(profile_index) + " -> " + self.format_committee(committee_index)
+                                + "\n" for profile_index, committee_index in enumerate(rule)))
+            print("The P-APP voting rule found on the whole domain was written to " + rule_file)
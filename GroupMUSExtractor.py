@@ -0,0 +1,105 @@
+import array
+import multiprocessing
+from typing import Iterator
+
+import pycosat
+
+from DimacsWriter import DimacsWriter
+
+_worker_extractor = None
+'Group MUS extractor used by the worker processes that test subsets of profiles.'
+
+
+def _initialize_worker(extractor: "GroupMUSExtractor") -> None:
+    """Stores the group MUS extractor in the worker process."""
+    global _worker_extractor
+    _worker_extractor = extractor
+
+
+def _test_profiles(profile_indices: list[int]) -> bool:
+    """Decides in a worker process whether the formula restricted to the given profiles is unsatisfiable."""
+    return _worker_extractor.is_unsatisfiable(profile_indices)
+
+
+class GroupMUSExtractor:
+    """This class shrinks a set of profiles whose formula is unsatisfiable to a minimal such set (a group MUS in
+    which the clauses of every profile form a group). The formula restricted to a set of profiles consists of the
+    constraints of these profiles and the strategy-proofness constraints between them, plus some background
+    clauses (e.g., for symmetry breaking). Restricting the profile set only removes clauses, so if the formula of a
+    set is satisfiable, so is the formula of every subset. Hence, we can bisect: if the formula of the necessary
+    profiles found so far together with a prefix of the candidates is unsatisfiable, but becomes satisfiable if the
+    last profile of the prefix is removed, this profile is necessary and all later candidates can be dropped. The
+    shortest such prefix is found by testing several prefixes in parallel worker processes in every step, so a
+    minimal set of k profiles is found with about k log(n) / log(jobs + 1) rounds of tests. The clauses are stored
+    as arrays of literals terminated by 0 (see DimacsWriter.pack_clauses) to keep the memory of the workers small."""
+
+    def __init__(self, formula_constructor, profile_indices: list[int], background_clauses: list[list[int]] = None,
+                 jobs: int = 1):
+        self.jobs = jobs
+        self.number_of_tests = 0
+        self.background_clauses = background_clauses if background_clauses is not None else []
+        self._profile_clauses: dict[int, array.array] = {}
+        self._pair_clauses: dict[int, list[tuple[int, array.array]]] = {}
+        'The strategy-proofness constraints between two profiles are stored with the profile of larger index.'
+        profile_set = set(profile_indices)
+        for profile_index in profile_indices:
+            self._profile_clauses[profile_index] = \
+                DimacsWriter.pack_clauses(formula_constructor.write_profile_constraints(profile_index))
+            self._pair_clauses[profile_index] = []
+            for old_ballot, ballot, neighbour_index in formula_constructor.compute_manipulations(
+                    profile_index, formula_constructor.profiles[profile_index].tolist()):
+                if neighbour_index < profile_index and neighbour_index in profile_set:
+                    clauses = list(formula_constructor.write_manipulation_constraint(profile_index, ballot,
+                                                                                     neighbour_index))
+                    clauses.extend(formula_constructor.write_manipulation_constraint(neighbour_index, old_ballot,
+                                                                                     profile_index))
+                    self._pair_clauses[profile_index].append((neighbour_index, DimacsWriter.pack_clauses(clauses)))
+
+    def write_clauses(self, profile_indices: list[int]) -> Iterator[list[int]]:
+        """This function lazily writes the formula restricted to the given profiles."""
+        profile_set = set(profile_indices)
+        yield from self.background_clauses
+        for profile_index in profile_indices:
+            yield from DimacsWriter.unpack_clauses(self._profile_clauses[profile_index])
+            for neighbour_index, literals in self._pair_clauses[profile_index]:
+                if neighbour_index in profile_set:
+                    yield from DimacsWriter.unpack_clauses(literals)
+
+    def is_unsatisfiable(self, profile_indices: list[int]) -> bool:
+        """This function decides whether the formula restricted to the given profiles is unsatisfiable."""
+        return pycosat.solve(self.write_clauses(profile_indices)) == "UNSAT"
+
+    def _test(self, pool, candidates: list[list[int]]) -> list[bool]:
+        """This function decides for each of the given profile sets whether its formula is unsatisfiable."""
+        self.number_of_tests += len(candidates)
+        if pool is None:
+            return [self.is_unsatisfiable(profile_indices) for profile_indices in candidates]
+        return pool.map(_test_profiles, candidates)
+
+    def extract(self, profile_indices: list[int]) -> list[int]:
+        """This function takes a set of profiles whose formula is unsatisfiable and returns a minimal subset whose
+        formula is unsatisfiable."""
+        necessary_profiles = []
+        candidates = sorted(profile_indices)
+        pool = multiprocessing.Pool(self.jobs, initializer=_initialize_worker, initargs=(self,)) \
+            if self.jobs > 1 else None
+        try:
+            while not self._test(pool, [necessary_profiles])[0]:
+                'The prefix of length high is unsatisfiable and the prefix of length low is satisfiable.'
+                low, high = 0, len(candidates)
+                while high - low > 1:
+                    number_of_points = min(self.jobs, high - low - 1)
+                    lengths = sorted(set(low + (high - low) * (point + 1) // (number_of_points + 1)
+                                         for point in range(0, number_of_points)))
+                    results = self._test(pool, [necessary_profiles + candidates[:length] for length in lengths])
+                    for length, unsatisfiable in zip(lengths, results):
+                        if unsatisfiable:
+                            high = length
+                            break
+                        low = length
+                necessary_profiles.append(candidates[high - 1])
+                candidates = candidates[:high - 1]
+            return sorted(necessary_profiles)
+        finally:
+            if pool is not None:
+                pool.terminate()
@@ -0,0 +1,212 @@
+import os
+import tempfile
+import time
+from typing import Iterator
+
+import numpy as np
+import pycosat
+
+from PAPPElectionBuilder import PAPPElectionBuilder
+from DimacsWriter import DimacsWriter
+from SolverPortfolio import SolverPortfolio
+
+
+class LazyDomainSolver:
+    """This class decides the satisfiability of the logical formula of a FormulaConstructor without encoding all
+    profiles of the domain (counterexample-guided abstraction refinement). We only encode the constraints among a
+    set of active profiles, starting with a seed set such as the domain A_{SAT}. If this formula is unsatisfiable,
+    so is the formula of the whole domain, since it consists of a subset of its clauses. Otherwise, we try to
+    extend the P-APP voting rule of the satisfying assignment greedily to the remaining profiles: every remaining
+    profile is mapped to the first feasible committee that admits no manipulation with the profiles mapped so far.
+    If this succeeds for all profiles, the extended rule is strategy-proof on the whole domain. Otherwise, the
+    profiles for which no committee is left (and the greedily mapped profiles that ruled out their committees) are
+    activated and the formula is solved again. The procedure terminates since every round activates at least one
+    profile. The clauses of the active profiles are stored as compact array of literals (see
+    DimacsWriter.pack_clauses)."""
+
+    def __init__(self, formula_constructor, seed_profiles: list[int], additional_clauses: list[list[int]] = None):
+        self.formula_constructor = formula_constructor
+        self.data_manager = formula_constructor.data_manager
+        self.number_of_profiles = len(formula_constructor.profiles)
+        self.active_profiles = bytearray(self.number_of_profiles)
+        self.number_of_active_profiles = 0
+        self.clauses = DimacsWriter.pack_clauses(additional_clauses if additional_clauses is not None else [])
+        self.number_of_clauses = len(additional_clauses) if additional_clauses is not None else 0
+        self.rounds = 0
+        self.result = None
+        'The verdict of the last call of solve: "SAT", "UNSAT", or "UNKNOWN" if the solver timeout was reached.'
+        self._feasible_committee_sets = [sum(1 << committee for committee in feasible_committees) for
+                                         feasible_committees in formula_constructor.feasible_committees_for_all_profiles]
+        numbers_of_approvals = formula_constructor.numbers_of_approvals.tolist()
+        self._preferred_committees = [[sum(1 << committee for committee, number in enumerate(row) if number > threshold)
+                                       for threshold in row] for row in numbers_of_approvals]
+        'For every ballot b and committee c, the set of committees that a voter with ballot b prefers to c.'
+        self._less_preferred_committees = [[sum(1 << committee for committee, number in enumerate(row)
+                                                if number < threshold) for threshold in row]
+                                           for row in numbers_of_approvals]
+        'For every ballot b and committee c, the set of committees that a voter with ballot b likes less than c.'
+        self._activate_profiles(sorted(set(seed_profiles)))
+
+    @staticmethod
+    def compute_seed_profiles(formula_constructor) -> list[int]:
+        """This function returns the indices of the profiles of the domain that belong to the domain A_{SAT}
+        specified in [1] (with the caps of the formula constructor). If the domain of the formula constructor is
+        A_{SAT} itself, these are all profiles."""
+        election_builder = formula_constructor.election_builder
+        if not election_builder.profile_all:
+            return list(range(0, len(formula_constructor.profiles)))
+        seed_builder = PAPPElectionBuilder(election_builder.k, election_builder.m, election_builder.n, False,
+                                           election_builder.max_approvals_per_party,
+                                           election_builder.max_total_approvals)
+        'The ballots of A_{SAT} are a prefix of all ballots, so the ballot indices agree.'
+        return [formula_constructor.data_manager.get_profile_index(list(profile))
+                for profile in seed_builder.enumerate_approval_profiles(seed_builder.compute_approval_ballots())]
+
+    def _activate_profiles(self, profile_indices: list[int]) -> None:
+        """This function adds the constraints of the given profiles and the strategy-proofness constraints between
+        them and all active profiles to the formula. Manipulations are symmetric: if a voter with ballot a can
+        change the profile p into the profile q by reporting b, a voter with ballot b can change q into p by
+        reporting a. Hence, both directions can be generated from the newly activated profile."""
+        for profile_index in profile_indices:
+            self.active_profiles[profile_index] = 1
+        self.number_of_active_profiles += len(profile_indices)
+        new_profiles = set(profile_indices)
+        for profile_index in profile_indices:
+            self._add_clauses(self.formula_constructor.write_profile_constraints(profile_index))
+            for old_ballot, ballot, neighbour_index in self.formula_constructor.compute_manipulations(
+                    profile_index, self.formula_constructor.profiles[profile_index].tolist()):
+                if not self.active_profiles[neighbour_index]:
+                    continue
+                self._add_clauses(self.formula_constructor.write_manipulation_constraint(profile_index, ballot,
+                                                                                        neighbour_index))
+                if neighbour_index not in new_profiles:
+                    self._add_clauses(self.formula_constructor.write_manipulation_constraint(
+                        neighbour_index, old_ballot, profile_index))
+
+    def _add_clauses(self, clauses: Iterator[list[int]]) -> None:
+        """This function appends the clauses to the compact clause storage."""
+        for clause in clauses:
+            self.clauses.extend(clause)
+            self.clauses.append(0)
+            self.number_of_clauses += 1
+
+    def write_clauses(self) -> Iterator[list[int]]:
+        """This function lazily writes the clauses of the formula restricted to the active profiles."""
+        return DimacsWriter.unpack_clauses(self.clauses)
+
+    def compute_compact_renaming(self, chunk_size: int = 1 << 20) -> np.ndarray:
+        """This function numbers the variables of the formula restricted to the active profiles consecutively: the
+        variables of the active profiles (in their original order), followed by the auxiliary variables occurring
+        in the clauses. It returns an array stating the new number of every variable (0 for unused variables). The
+        variables of the active profiles stay consecutive per profile, so the new number of the variable of the
+        i-th feasible committee of an active profile p is the new number of get_first_variable(p) plus i."""
+        used = np.zeros(self.data_manager.number_of_variables + 1, dtype=bool)
+        for profile_index in np.flatnonzero(np.frombuffer(self.active_profiles, dtype=np.uint8)).tolist():
+            first_variable = self.data_manager.get_first_variable(profile_index)
+            used[first_variable:first_variable
+                 + len(self.data_manager.get_feasible_committees_for_profile(profile_index))] = True
+        literals = np.frombuffer(self.clauses, dtype=np.intc)
+        for start in range(0, len(literals), chunk_size):
+            used[np.abs(literals[start:start + chunk_size])] = True
+        used[0] = False
+        renaming = np.zeros(len(used), dtype=np.intc)
+        renaming[used] = np.arange(1, int(used.sum()) + 1, dtype=np.intc)
+        return renaming
+
+    def write_renamed_clauses(self, renaming: np.ndarray, chunk_size: int = 65536) -> Iterator[list[int]]:
+        """This function lazily writes the clauses of the formula restricted to the active profiles with the
+        variables renamed according to compute_compact_renaming."""
+        literals = np.frombuffer(self.clauses, dtype=np.intc)
+        clause = []
+        for start in range(0, len(literals), chunk_size):
+            chunk = literals[start:start + chunk_size]
+            renamed_chunk = renaming[np.abs(chunk)]
+            np.negative(renamed_chunk, out=renamed_chunk, where=chunk < 0)
+            for literal in renamed_chunk.tolist():
+                if literal == 0:
+                    yield clause
+                    clause = []
+                else:
+                    clause.append(literal)
+
+    def _decode_rule(self, assignment: list[int]) -> list[int]:
+        """This function returns for every profile the committee chosen by the assignment, or -1 if the profile is
+        not active. The variables of inactive profiles occur in no clause, so their values are arbitrary and are
+        ignored."""
+        rule = [-1] * self.number_of_profiles
+        for literal in assignment:
+            if 0 < literal <= self.data_manager.number_of_committee_variables:
+                profile_index, committee_index = self.data_manager.decode_variable(literal)
+                if self.active_profiles[profile_index]:
+                    rule[profile_index] = committee_index
+        return rule
+
+    def _extend_rule(self, rule: list[int]) -> list[int]:
+        """This function greedily maps the inactive profiles to committees (in place) and returns the profiles
+        that have to be activated: the profiles for which no feasible committee is left, and the inactive
+        profiles that are adjacent to them and have already been mapped."""
+        conflicting_profiles = set()
+        for profile_index in range(0, self.number_of_profiles):
+            if self.active_profiles[profile_index]:
+                continue
+            candidates = self._feasible_committee_sets[profile_index]
+            mapped_neighbours = []
+            for old_ballot, ballot, neighbour_index in self.formula_constructor.compute_manipulations(
+                    profile_index, self.formula_constructor.profiles[profile_index].tolist()):
+                neighbour_committee = rule[neighbour_index]
+                if neighbour_committee >= 0:
+                    'The voter must neither gain by moving from the neighbour to this profile nor the other way.'
+                    candidates &= ~(self._preferred_committees[ballot][neighbour_committee]
+                                    | self._less_preferred_committees[old_ballot][neighbour_committee])
+                    if not self.active_profiles[neighbour_index]:
+                        mapped_neighbours.append(neighbour_index)
+            if candidates:
+                rule[profile_index] = (candidates & -candidates).bit_length() - 1
+            else:
+                conflicting_profiles.add(profile_index)
+                conflicting_profiles.update(mapped_neighbours)
+        return sorted(conflicting_profiles)
+
+    def _solve_active_formula(self, portfolio: SolverPortfolio, deadline: float):
+        """This function solves the formula restricted to the active profiles with pycosat, or with the portfolio
+        (which reads the formula from a temporary DIMACS file) within the time left until the deadline."""
+        if portfolio is None:
+            return pycosat.solve(self.write_clauses())
+        if deadline is not None:
+            portfolio.timeout = max(0.0, deadline - time.monotonic())
+        with tempfile.TemporaryDirectory() as directory:
+            formula_file = os.path.join(directory, "formula.cnf")
+            with DimacsWriter(formula_file) as writer:
+                writer.write_clauses(self.write_clauses())
+            return portfolio.solve(formula_file)
+
+    def solve(self, solver_jobs: int = 1, solver_timeout: float = None) -> list[int]:
+        """This function runs the refinement loop. It returns for every profile the committee chosen by a
+        strategy-proof P-APP voting rule on the whole domain, or None if there is no such rule or the verdict is
+        unknown (see result). If solver_jobs is larger than one or a solver timeout (in seconds, for all rounds
+        together) is given, the formula of every round is solved by a SolverPortfolio."""
+        portfolio = SolverPortfolio(solver_jobs, solver_timeout) \
+            if solver_jobs > 1 or solver_timeout is not None else None
+        deadline = time.monotonic() + solver_timeout if solver_timeout is not None else None
+        while True:
+            self.rounds += 1
+            assignment = self._solve_active_formula(portfolio, deadline)
+            if assignment == "UNKNOWN":
+                print("Round " + str(self.rounds) + ": the solver timeout was reached for the formula restricted to "
+                      + str(self.number_of_active_profiles) + " profiles.")
+                self.result = "UNKNOWN"
+                return None
+            if assignment == "UNSAT":
+                print("Round " + str(self.rounds) + ": the formula restricted to " + str(self.number_of_active_profiles)
+                      + " profiles is unsatisfiable.")
+                self.result = "UNSAT"
+                return None
+            rule = self._decode_rule(assignment)
+            conflicting_profiles = self._extend_rule(rule)
+            print("Round " + str(self.rounds) + ": the formula restricted to " + str(self.number_of_active_profiles)
+                  + " profiles is satisfiable; " + str(len(conflicting_profiles))
+                  + " further profiles are activated.")
+            if not conflicting_profiles:
+                self.result = "SAT"
+                return rule
+            self._activate_profiles(conflicting_profiles)
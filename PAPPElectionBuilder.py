@@ -1,48 +1,97 @@
 import numpy as np
 import itertools
+from typing import Iterator
 
 
 class PAPPElectionBuilder:
+    """Ballots are represented as m-bit integers (bit i is set if party i is approved), committees as rows of a
+    matrix stating for every party how many seats it receives, and profiles as rows of a matrix containing the
+    sorted indices of the voters' ballots in the ballot list."""
 
-    def __init__(self, committee_size: int, number_of_parties: int, number_of_voters: int, profile_all: bool):
+    def __init__(self, committee_size: int, number_of_parties: int, number_of_voters: int, profile_all: bool,
+                 max_approvals_per_party: int = 4, max_total_approvals: int = 11):
         self.m = number_of_parties
         self.k = committee_size
         self.n = number_of_voters
         self.parties = list(np.arange(0, self.m))
         self.voters = list(np.arange(0, self.n))
         self.profile_all = profile_all
+        self.max_approvals_per_party = max_approvals_per_party
+        self.max_total_approvals = max_total_approvals
+        'The caps on the approval scores define the domain A_{SAT} of [1]; they are ignored if profile_all is set.'
 
-    def _compute_approval_scores(self, profile: list[set[int]]) -> list[int]:
-        """Given a profile, this function returns the approval scores of all parties."""
-        approval_scores = np.zeros(self.m, dtype=int)
-        for party in range(0, self.m):
-            for ballot in profile:
-                if party in ballot:
-                    approval_scores[party] += 1
-        return list(approval_scores)
-
-    def compute_approval_ballots(self) -> list[set[int]]:
+    def compute_approval_ballots(self) -> list[int]:
         """This function computes the set of all ballots used for the logical formula."""
-        ballots = []
-        for i in range(1, 2 ** self.m):
-            ballots.append({party for party in self.parties if (i // (2 ** party)) % 2 == 1})
+        ballots = list(range(1, 2 ** self.m))
         if not self.profile_all:
             ballots = ballots[0:len(ballots) - 1]
         return ballots
 
-    def compute_all_committees(self) -> list[list[int]]:
-        """This function computes a list of all committees"""
-        committees = [list(committee) for committee in itertools.combinations_with_replacement(self.parties, self.k)]
+    def compute_all_committees(self) -> np.ndarray:
+        """This function computes a matrix of all committees, where each row states how many seats each party
+        receives."""
+        committees_as_lists = list(itertools.combinations_with_replacement(range(0, self.m), self.k))
+        committees = np.zeros((len(committees_as_lists), self.m), dtype=np.int8)
+        for index, committee in enumerate(committees_as_lists):
+            for party in committee:
+                committees[index, party] += 1
         return committees
 
-    def compute_approval_profiles(self, ballots: list[set[int]]) -> list[list[set[int]]]:
-        """Given a set of ballots, this function computes the preference profiles used for the logical formula."""
-        profiles = [list(profile) for profile in itertools.combinations_with_replacement(ballots, self.n)]
+    def enumerate_approval_profiles(self, ballots: list[int]) -> Iterator[tuple[int, ...]]:
+        """Given a set of ballots, this function lazily enumerates the preference profiles used for the logical
+        formula as sorted tuples of ballot indices (in lexicographic order). For the domain A_{SAT}, we keep track
+        of the approval scores while adding voters one by one and abandon a branch as soon as the approval score
+        of a party or the total approval score exceeds its cap."""
         if self.profile_all:
-            return profiles
-        profs = []
-        for profile in profiles:
-            approval_scores = self._compute_approval_scores(profile)
-            if max(approval_scores) <= 4 and sum(approval_scores) <= 11:
-                profs.append(profile)
-        return profs
+            yield from itertools.combinations_with_replacement(range(0, len(ballots)), self.n)
+            return
+        approved_parties = [[party for party in range(0, self.m) if (ballot >> party) & 1] for ballot in ballots]
+        approval_scores = [0] * self.m
+        profile = []
+
+        def extend_profile(first_ballot_index: int, total_approvals: int) -> Iterator[tuple[int, ...]]:
+            if len(profile) == self.n:
+                yield tuple(profile)
+                return
+            'Every remaining voter approves at least one party.'
+            minimal_remaining_approvals = self.n - len(profile) - 1
+            for ballot_index in range(first_ballot_index, len(ballots)):
+                parties = approved_parties[ballot_index]
+                if total_approvals + len(parties) + minimal_remaining_approvals > self.max_total_approvals:
+                    continue
+                if any(approval_scores[party] >= self.max_approvals_per_party for party in parties):
+                    continue
+                for party in parties:
+                    approval_scores[party] += 1
+                profile.append(ballot_index)
+                yield from extend_profile(ballot_index, total_approvals + len(parties))
+                profile.pop()
+                for party in parties:
+                    approval_scores[party] -= 1
+
+        yield from extend_profile(0, 0)
+
+    def compute_approval_profiles(self, ballots: list[int]) -> np.ndarray:
+        """Given a set of ballots, this function computes the preference profiles used for the logical formula.
+        Each profile is a sorted row of ballot indices."""
+        profiles = itertools.chain.from_iterable(self.enumerate_approval_profiles(ballots))
+        return np.fromiter(profiles, dtype=np.min_scalar_type(len(ballots))).reshape(-1, self.n)
+
+    @staticmethod
+    def ballot_to_parties(ballot: int) -> set[int]:
+        """Converts a ballot given as bitmask into the set of approved parties."""
+        return {party for party in range(0, ballot.bit_length()) if (ballot >> party) & 1}
+
+    @staticmethod
+    def parties_to_ballot(parties: set[int]) -> int:
+        """Converts a set of approved parties into the corresponding bitmask."""
+        return sum(1 << int(party) for party in set(parties))
+
+    @staticmethod
+    def committee_to_parties(committee: np.ndarray) -> list[int]:
+        """Converts a committee given as vector of seat counts into the sorted list of its members."""
+        return [party for party in range(0, len(committee)) for _ in range(0, int(committee[party]))]
+
+    def parties_to_committee(self, parties: list[int]) -> list[int]:
+        """Converts a list of committee members into the vector stating how many seats each party receives."""
+        return [list(parties).count(party) for party in range(0, self.m)]
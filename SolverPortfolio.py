@@ -0,0 +1,89 @@
+import multiprocessing
+import random
+from typing import Iterator
+
+import numpy as np
+import pycosat
+
+from DimacsWriter import DimacsWriter
+
+_worker_input_file = None
+'DIMACS file solved by the worker processes of the portfolio.'
+
+
+def _initialize_worker(input_file: str) -> None:
+    """Stores the name of the DIMACS file in the worker process."""
+    global _worker_input_file
+    _worker_input_file = input_file
+
+
+def _write_shuffled_clauses(literals: np.ndarray, ends: np.ndarray, order: np.ndarray,
+                            generator: random.Random, chunk_size: int = 65536) -> Iterator[list[int]]:
+    """Lazily writes the clauses stored in the array of literals (each clause terminated by 0 at the given end
+    positions) in the given order, shuffling the literals of every clause."""
+    for start in range(0, len(order), chunk_size):
+        clause_indices = order[start:start + chunk_size]
+        clause_ends = ends[clause_indices].tolist()
+        clause_starts = np.where(clause_indices > 0, ends[clause_indices - 1] + 1, 0).tolist()
+        for clause_start, clause_end in zip(clause_starts, clause_ends):
+            clause = literals[clause_start:clause_end].tolist()
+            generator.shuffle(clause)
+            yield clause
+
+
+def _solve_configuration(configuration: int):
+    """Solves the formula with the given configuration of the portfolio in a worker process and returns the
+    configuration together with the result of pycosat (with the assignment mapped back to the original
+    variables). The clauses are streamed from the file into the solver; the shuffled configurations store them
+    as compact array of literals (see DimacsWriter.pack_clauses) in between."""
+    if configuration == 0:
+        return configuration, pycosat.solve(DimacsWriter.read_clauses(_worker_input_file))
+    'All other configurations rename the variables, flip their signs, and shuffle the clauses and literals.'
+    literals = np.frombuffer(DimacsWriter.pack_clauses(DimacsWriter.read_clauses(_worker_input_file)),
+                             dtype=np.intc)
+    ends = np.flatnonzero(literals == 0)
+    number_of_variables = int(np.abs(literals).max()) if len(literals) > 0 else 0
+    numbers = np.random.default_rng(configuration)
+    renaming = np.zeros(number_of_variables + 1, dtype=np.intc)
+    renaming[1:] = (numbers.permutation(number_of_variables) + 1) * numbers.choice([-1, 1], number_of_variables)
+    renamed_literals = renaming[np.abs(literals)]
+    np.negative(renamed_literals, out=renamed_literals, where=literals < 0)
+    del literals
+    result = pycosat.solve(_write_shuffled_clauses(renamed_literals, ends, numbers.permutation(len(ends)),
+                                                   random.Random(configuration)))
+    if not isinstance(result, list):
+        return configuration, result
+    values = np.zeros(number_of_variables + 1, dtype=bool)
+    assignment = np.array(result, dtype=np.int64)
+    values[np.abs(assignment)] = assignment > 0
+    variables = np.arange(1, number_of_variables + 1)
+    'The original variable v is true iff the renamed literal renaming[v] is true.'
+    original_values = values[np.abs(renaming[1:])] == (renaming[1:] > 0)
+    return configuration, np.where(original_values, variables, -variables).tolist()
+
+
+class SolverPortfolio:
+    """This class solves a formula in DIMACS format with a portfolio of pycosat instances running in parallel
+    worker processes. The first configuration solves the formula as it is; the other ones rename the variables,
+    flip their signs, and shuffle the order of the clauses and literals (with different random seeds), which can
+    change the running time of the solver considerably. The first answer wins and the remaining workers are
+    stopped. If no worker answers within the timeout, the result is UNKNOWN."""
+
+    def __init__(self, jobs: int = 1, timeout: float = None, seed: int = 0):
+        self.jobs = jobs
+        self.timeout = timeout
+        self.seed = seed
+        self.winning_configuration = None
+
+    def solve(self, input_file: str):
+        """This function returns a satisfying assignment (as list of literals) of the formula in the input file,
+        "UNSAT" if the formula is unsatisfiable, or "UNKNOWN" if the timeout was reached."""
+        configurations = [0] + [self.seed * self.jobs + index for index in range(1, self.jobs)]
+        with multiprocessing.Pool(self.jobs, initializer=_initialize_worker, initargs=(input_file,)) as pool:
+            results = pool.imap_unordered(_solve_configuration, configurations)
+            try:
+                self.winning_configuration, result = results.next(self.timeout)
+            except multiprocessing.TimeoutError:
+                result = "UNKNOWN"
+            pool.terminate()
+        return result
@@ -0,0 +1,95 @@
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import resource
+except ImportError:
+    resource = None
+    'The resource module is not available on Windows; the resident set size is not reported there.'
+
+
+class StatisticsCollector:
+    """This class collects statistics about the phases of the construction of the logical formula: for every
+    phase, the wall time, the peak memory, and counts such as the number of profiles or clauses. The peak memory
+    is measured in two ways. The maximal resident set size of the process (and its worker processes) is cheap to
+    obtain, but it only grows, so a phase only shows a larger value if it needs more memory than all previous
+    phases. If trace_memory is set, we additionally trace the memory allocated by Python and numpy with
+    tracemalloc, which yields the peak of every single phase but slows down the computation considerably. If the
+    collector is disabled, measuring a phase does nothing, so callers do not need to distinguish both cases."""
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = False):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.phases: list[dict] = []
+        self.parameters: dict = {}
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[dict]:
+        """This function measures the phase executed in the body of the with statement. It yields the dictionary
+        of the phase, into which the caller can write counts."""
+        statistics = {"phase": phase}
+        if not self.enabled:
+            yield statistics
+            return
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            traced_memory_before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield statistics
+        finally:
+            statistics["wall_time"] = time.perf_counter() - start
+            if self.trace_memory:
+                statistics["peak_traced_memory"] = tracemalloc.get_traced_memory()[1] - traced_memory_before
+            if resource is not None:
+                statistics["max_rss"] = self._compute_max_rss()
+            self.phases.append(statistics)
+
+    @staticmethod
+    def _compute_max_rss() -> int:
+        """Returns the maximal resident set size of this process and its terminated worker processes in bytes."""
+        max_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        'Linux reports kilobytes, macOS reports bytes.'
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+    def to_dict(self) -> dict:
+        """This function returns the parameters, the statistics of all phases, and their total as a dictionary
+        that can be serialized to JSON."""
+        total = {"phase": "total", "wall_time": sum(statistics["wall_time"] for statistics in self.phases)}
+        for key in ["peak_traced_memory", "max_rss"]:
+            values = [statistics[key] for statistics in self.phases if key in statistics]
+            if values:
+                total[key] = max(values)
+        return {"parameters": self.parameters, "phases": self.phases, "total": total}
+
+    def write_json(self, output_file: str) -> None:
+        """This function writes the statistics as JSON into the output file."""
+        with open(output_file, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write("\n")
+
+    def format_table(self) -> str:
+        """This function returns the statistics as readable table with one line per phase."""
+        statistics = self.to_dict()
+        lines = ["phase".ljust(28) + "wall time".rjust(12) + "peak memory".rjust(14) + "max rss".rjust(12) + "  counts"]
+        for phase in statistics["phases"] + [statistics["total"]]:
+            counts = ", ".join(key.replace("_", " ") + " " + str(value) for key, value in phase.items()
+                               if key not in {"phase", "wall_time", "peak_traced_memory", "max_rss"})
+            lines.append(phase["phase"].ljust(28) + ("%.3fs" % phase["wall_time"]).rjust(12)
+                         + self._format_bytes(phase.get("peak_traced_memory")).rjust(14)
+                         + self._format_bytes(phase.get("max_rss")).rjust(12) + "  " + counts)
+        return "\n".join(lines)
+
+    @staticmethod
+    def _format_bytes(number_of_bytes: int) -> str:
+        """Returns a number of bytes in mebibytes or - if it is unknown."""
+        if number_of_bytes is None:
+            return "-"
+        return "%.1f MiB" % (number_of_bytes / 2 ** 20)
@@ -0,0 +1,108 @@
+import itertools
+
+import numpy as np
+
+
+class SymmetryBreaker:
+    """This class computes symmetry-breaking constraints for the logical formula of a FormulaConstructor. Renaming
+    the parties maps ballots, committees, and profiles to ballots, committees, and profiles, and all axioms we
+    encode treat the parties equally. Hence, every permutation of the parties that maps the domain and the feasible
+    committees of every profile onto themselves induces a permutation of the variables that maps the formula onto
+    itself, i.e., maps satisfying assignments to satisfying assignments. (Permutations of the voters need not be
+    considered since the formula is anonymous by construction.) We detect these permutations automatically and
+    add lex-leader constraints, which only admit satisfying assignments that are lexicographically minimal among
+    their images under all detected permutations. This preserves satisfiability since the minimal element of every
+    orbit satisfies all constraints."""
+
+    DEFAULT_DEPTH = 1000
+    'By default, the lex-leader constraint of a permutation only compares the first 1000 variables it moves.'
+
+    def __init__(self, formula_constructor):
+        self.formula_constructor = formula_constructor
+        self.data_manager = formula_constructor.data_manager
+        self.number_of_parties = formula_constructor.committees.shape[1]
+
+    def _permute_ballots(self, permutation: tuple[int, ...]) -> list[int]:
+        """This function returns for every ballot index the index of the ballot whose parties are renamed
+        according to the permutation, or None if some renamed ballot is not part of the ballot list."""
+        ballot_map = []
+        for ballot in self.formula_constructor.ballots:
+            image = sum(1 << permutation[party] for party in range(0, self.number_of_parties) if (ballot >> party) & 1)
+            if image not in self.data_manager.ballots_to_list_index:
+                return None
+            ballot_map.append(self.data_manager.get_ballot_index(image))
+        return ballot_map
+
+    def _permute_committees(self, permutation: tuple[int, ...]) -> list[int]:
+        """This function returns for every committee index the index of the committee whose parties are renamed
+        according to the permutation."""
+        images = np.zeros_like(self.formula_constructor.committees)
+        images[:, list(permutation)] = self.formula_constructor.committees
+        return [self.data_manager.get_committee_index(image) for image in images.tolist()]
+
+    def compute_variable_permutation(self, permutation: tuple[int, ...]) -> np.ndarray:
+        """This function takes a permutation of the parties and returns the induced permutation of the variables
+        that encode profiles and committees as array: the entry at position v - 1 is the image of variable v. If
+        the permutation does not map the domain and the feasible committees onto themselves, None is returned."""
+        ballot_map = self._permute_ballots(permutation)
+        if ballot_map is None:
+            return None
+        images_of_profiles = np.array(ballot_map)[self.formula_constructor.profiles]
+        images_of_profiles.sort(axis=1)
+        profile_map = np.array(self.data_manager.get_profile_indices(images_of_profiles), dtype=np.int64)
+        if (profile_map < 0).any():
+            return None
+        committee_map = np.array(self._permute_committees(permutation), dtype=np.int64)
+        feasible_committees_for_all_profiles = self.formula_constructor.feasible_committees_for_all_profiles
+        profile_of_variable = np.repeat(np.arange(0, len(profile_map)), [len(feasible_committees) for feasible_committees
+                                                                         in feasible_committees_for_all_profiles])
+        committee_of_variable = np.fromiter(itertools.chain.from_iterable(feasible_committees_for_all_profiles),
+                                            dtype=np.int64, count=len(profile_of_variable))
+        'Variables are ordered by profile and committee, so the pairs (profile, committee) are sorted as numbers.'
+        number_of_committees = len(committee_map)
+        keys = profile_of_variable * number_of_committees + committee_of_variable
+        images = profile_map[profile_of_variable] * number_of_committees + committee_map[committee_of_variable]
+        positions = np.minimum(np.searchsorted(keys, images), max(len(keys) - 1, 0))
+        if len(keys) > 0 and (keys[positions] != images).any():
+            return None
+        'The map is injective, so it is a bijection if every image is a variable.'
+        return positions + 1
+
+    def compute_symmetries(self) -> list[np.ndarray]:
+        """This function returns the variable permutations induced by all permutations of the parties (except the
+        identity) that map the domain and the feasible committees onto themselves."""
+        symmetries = []
+        for permutation in itertools.permutations(range(0, self.number_of_parties)):
+            if permutation == tuple(range(0, self.number_of_parties)):
+                continue
+            variable_permutation = self.compute_variable_permutation(permutation)
+            if variable_permutation is not None:
+                symmetries.append(variable_permutation)
+        return symmetries
+
+    def write_lex_leader_constraints(self, symmetries: list[np.ndarray], depth: int = DEFAULT_DEPTH) \
+            -> list[list[int]]:
+        """This function encodes for every variable permutation s that the assignment x is lexicographically at
+        most its image, i.e., (x_1, ..., x_N) <=_lex (x_s(1), ..., x_s(N)). Variables with s(v) = v can be skipped,
+        and only the first depth moved variables are compared (all of them if depth is None), which weakens but
+        never invalidates the constraint. The auxiliary variable e_i states that the first i compared variables
+        agree with their images; it is forced by the clauses (-e_{i-1} | -x_i | x_s(i)), (-e_{i-1} | -x_i | e_i),
+        and (-e_{i-1} | x_s(i) | e_i)."""
+        clauses = []
+        for variable_permutation in symmetries:
+            moved_variables = np.flatnonzero(variable_permutation != np.arange(1, len(variable_permutation) + 1)) + 1
+            if depth is not None:
+                moved_variables = moved_variables[:depth]
+            if len(moved_variables) == 0:
+                continue
+            images = variable_permutation[moved_variables - 1].tolist()
+            first_equality_variable = self.data_manager.allocate_auxiliary_variables([len(moved_variables) - 1])[0]
+            previous_equality = []
+            for position, (variable, image) in enumerate(zip(moved_variables.tolist(), images)):
+                clauses.append(previous_equality + [-variable, image])
+                if position < len(moved_variables) - 1:
+                    equality_variable = first_equality_variable + position
+                    clauses.append(previous_equality + [-variable, equality_variable])
+                    clauses.append(previous_equality + [image, equality_variable])
+                    previous_equality = [-equality_variable]
+        return clauses